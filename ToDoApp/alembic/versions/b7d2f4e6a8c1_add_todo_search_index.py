@@ -0,0 +1,57 @@
+"""add todo search index
+
+Revision ID: b7d2f4e6a8c1
+Revises: a3c5e7d9b1f2
+Create Date: 2026-10-18 19:14:52.302118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f4e6a8c1'
+down_revision: Union[str, Sequence[str], None] = 'a3c5e7d9b1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Mirrors search.SEARCH_DDL as of this revision
+UPGRADE = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5("
+        "title, description, content='todos', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN "
+        "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN "
+        "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF title, description ON todos BEGIN "
+        "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+        "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')", # Index the todos that already exist
+    ],
+    "postgresql": [
+        "CREATE INDEX IF NOT EXISTS ix_todos_search ON todos USING gin "
+        "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')))",
+    ],
+}
+
+DOWNGRADE = {
+    "sqlite": ["DROP TRIGGER IF EXISTS todos_fts_update", "DROP TRIGGER IF EXISTS todos_fts_delete",
+               "DROP TRIGGER IF EXISTS todos_fts_insert", "DROP TABLE IF EXISTS todos_fts"],
+    "postgresql": ["DROP INDEX IF EXISTS ix_todos_search"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for statement in UPGRADE.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in DOWNGRADE.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
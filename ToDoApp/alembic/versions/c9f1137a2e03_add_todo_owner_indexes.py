@@ -0,0 +1,30 @@
+"""add todo owner indexes
+
+Revision ID: c9f1137a2e03
+Revises: 5093b69c3d10
+Create Date: 2026-10-18 09:12:41.530214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f1137a2e03'
+down_revision: Union[str, Sequence[str], None] = '5093b69c3d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_todos_owner_id_completed_priority', 'todos', ['owner_id', 'completed', 'priority'])
+    op.create_index('ix_todos_owner_id_id', 'todos', ['owner_id', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_owner_id_id', table_name='todos')
+    op.drop_index('ix_todos_owner_id_completed_priority', table_name='todos')
@@ -0,0 +1,49 @@
+"""add todo change tracking
+
+Revision ID: d4e6f8a0c2b3
+Revises: b7d2f4e6a8c1
+Create Date: 2026-10-18 19:48:05.117390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e6f8a0c2b3'
+down_revision: Union[str, Sequence[str], None] = 'b7d2f4e6a8c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('todos', sa.Column('change_seq', sa.Integer(), nullable=True))
+    # Existing rows predate any sync token, so sequence 0 is accurate and keeps them off the stamping path
+    op.execute("UPDATE todos SET change_seq = 0")
+    op.create_index('ix_todos_owner_id_change_seq', 'todos', ['owner_id', 'change_seq'])
+
+    op.add_column('users', sa.Column('todos_purged_seq', sa.Integer(), nullable=False, server_default='0'))
+
+    op.create_table(
+        'todo_tombstones',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('todo_id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('change_seq', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_todo_tombstones_owner_id_change_seq', 'todo_tombstones', ['owner_id', 'change_seq'])
+    op.create_index('ix_todo_tombstones_deleted_at', 'todo_tombstones', ['deleted_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todo_tombstones_deleted_at', table_name='todo_tombstones')
+    op.drop_index('ix_todo_tombstones_owner_id_change_seq', table_name='todo_tombstones')
+    op.drop_table('todo_tombstones')
+    op.drop_column('users', 'todos_purged_seq')
+    op.drop_index('ix_todos_owner_id_change_seq', table_name='todos')
+    op.drop_column('todos', 'change_seq')
@@ -0,0 +1,40 @@
+"""create todos archive table
+
+Revision ID: e1f3a5c7b9d2
+Revises: d4e6f8a0c2b3
+Create Date: 2026-10-18 20:21:39.640271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f3a5c7b9d2'
+down_revision: Union[str, Sequence[str], None] = 'd4e6f8a0c2b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'todos_archive',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_todos_archive_owner_id_id', 'todos_archive', ['owner_id', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_archive_owner_id_id', table_name='todos_archive')
+    op.drop_table('todos_archive')
@@ -0,0 +1,36 @@
+"""add version and updated_at columns
+
+Revision ID: e8f321ad2edb
+Revises: c9f1137a2e03
+Create Date: 2026-10-18 11:03:27.184402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8f321ad2edb'
+down_revision: Union[str, Sequence[str], None] = 'c9f1137a2e03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('users', sa.Column('todos_version', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('todos_updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('todos', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('todos', 'updated_at')
+    op.drop_column('users', 'todos_updated_at')
+    op.drop_column('users', 'todos_version')
+    op.drop_column('users', 'updated_at')
+    op.drop_column('users', 'version')
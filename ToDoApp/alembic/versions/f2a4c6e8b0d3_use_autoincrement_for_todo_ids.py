@@ -0,0 +1,65 @@
+"""use autoincrement for todo ids
+
+Revision ID: f2a4c6e8b0d3
+Revises: e1f3a5c7b9d2
+Create Date: 2026-10-18 21:05:12.480913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a4c6e8b0d3'
+down_revision: Union[str, Sequence[str], None] = 'e1f3a5c7b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# SQLite only: without AUTOINCREMENT it hands out max(id) + 1, so deleting or archiving the
+# newest todo lets its id come back. Postgres sequences never reuse ids.
+
+# Recreating todos drops its triggers; mirrors search.SEARCH_DDL as of this revision
+SEARCH_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF title, description ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+# Start past every id handed out so far, archived ones included
+SEED_SEQUENCE = [
+    "INSERT INTO sqlite_sequence (name, seq) SELECT 'todos', 0 "
+    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'todos')",
+    "UPDATE sqlite_sequence SET seq = max(seq, (SELECT coalesce(max(id), 0) FROM todos), "
+    "(SELECT coalesce(max(id), 0) FROM todos_archive)) WHERE name = 'todos'",
+]
+
+
+def _recreate_todos(autoincrement: bool) -> None:
+    with op.batch_alter_table('todos', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': autoincrement}) as batch_op:
+        pass
+    for statement in SEARCH_TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate_todos(True)
+    for statement in SEED_SEQUENCE:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate_todos(False)
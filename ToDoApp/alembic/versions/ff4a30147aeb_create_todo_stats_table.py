@@ -0,0 +1,53 @@
+"""create todo stats table
+
+Revision ID: ff4a30147aeb
+Revises: e8f321ad2edb
+Create Date: 2026-10-18 12:41:09.662817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ff4a30147aeb'
+down_revision: Union[str, Sequence[str], None] = 'e8f321ad2edb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'todo_stats',
+        sa.Column('owner_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('completed', sa.Integer(), nullable=False),
+        sa.Column('priority_1', sa.Integer(), nullable=False),
+        sa.Column('priority_2', sa.Integer(), nullable=False),
+        sa.Column('priority_3', sa.Integer(), nullable=False),
+        sa.Column('priority_4', sa.Integer(), nullable=False),
+        sa.Column('priority_5', sa.Integer(), nullable=False),
+    )
+    # Backfill so ADMIN_STATS_MODE=materialized is correct from the first request
+    op.execute("""
+        INSERT INTO todo_stats (owner_id, total, completed, priority_1, priority_2, priority_3, priority_4, priority_5)
+        SELECT owner_id,
+               COUNT(*),
+               SUM(CASE WHEN completed THEN 1 ELSE 0 END),
+               SUM(CASE WHEN priority = 1 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN priority = 2 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN priority = 3 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN priority = 4 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN priority = 5 THEN 1 ELSE 0 END)
+        FROM todos
+        WHERE owner_id IS NOT NULL
+        GROUP BY owner_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('todo_stats')
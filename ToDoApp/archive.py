@@ -0,0 +1,71 @@
+import asyncio
+import os
+from datetime import timedelta
+from sqlalchemy import select, insert, delete, union_all, or_
+from models import ToDos, ArchivedTodos, utcnow
+from schemas import TodoOut
+from todo_writes import todos_changed, todos_committed
+from stats import stats_delta
+from events import RESYNC
+
+# Hot/cold split: completed todos untouched for TODO_ARCHIVE_AFTER_DAYS move to todos_archive,
+# so the table every listing scans only grows with open and recent work. Archived todos are
+# read-only and only show up with ?include_archived=true.
+
+TODO_ARCHIVE_AFTER_DAYS = int(os.getenv("TODO_ARCHIVE_AFTER_DAYS", "90"))
+TODO_ARCHIVE_CHUNK_SIZE = int(os.getenv("TODO_ARCHIVE_CHUNK_SIZE", "500"))
+
+TODO_FIELDS = tuple(TodoOut.model_fields)
+
+
+def todo_columns(todos) -> tuple:
+    # TodoOut's columns from ToDos, ArchivedTodos or the combined subquery
+    return tuple(getattr(todos, name) for name in TODO_FIELDS)
+
+
+def todos_with_archive():
+    # Hot and archived rows as one selectable; owner/filter predicates are pushed into both branches
+    return union_all(select(*todo_columns(ToDos)), select(*todo_columns(ArchivedTodos))).subquery("all_todos").c
+
+
+async def archive_chunk(db, cutoff, chunk_size: int) -> int:
+    # One short transaction: DELETE ... RETURNING takes the rows (re-checking the criteria,
+    # so a todo reopened meanwhile stays put) and the same transaction inserts them into the archive
+    criteria = (ToDos.completed == True, or_(ToDos.updated_at < cutoff, ToDos.updated_at.is_(None)),
+                # Before todos used AUTOINCREMENT, SQLite could reuse an archived id; such a row stays hot rather than collide
+                ~select(ArchivedTodos.id).filter(ArchivedTodos.id == ToDos.id).exists())
+    ids = (await db.scalars(select(ToDos.id).filter(*criteria).order_by(ToDos.id).limit(chunk_size))).all()
+    if not ids:
+        return 0
+    rows = (await db.execute(delete(ToDos)
+                             .filter(ToDos.id.in_(ids), *criteria)
+                             .returning(*todo_columns(ToDos), ToDos.updated_at))).all()
+    if not rows:
+        return 0
+    archived_at = utcnow()
+    await db.execute(insert(ArchivedTodos), [{**row._asdict(), "archived_at": archived_at} for row in rows])
+
+    owner_ids = {row.owner_id for row in rows}
+    # Gone from the hot table as far as delta sync is concerned; ?include_archived still returns them
+    await todos_changed(db, owner_ids, deleted=[(row.id, row.owner_id) for row in rows],
+                        stats=stats_delta([(row.owner_id, row.completed, row.priority) for row in rows]))
+    await db.commit()
+    await todos_committed(owner_ids, [(owner_id, RESYNC) for owner_id in owner_ids])
+    return len(rows)
+
+
+async def archive_completed_todos(db, older_than_days: int = TODO_ARCHIVE_AFTER_DAYS,
+                                  chunk_size: int = TODO_ARCHIVE_CHUNK_SIZE, pause: float = 0.0,
+                                  progress=None) -> int:
+    # Chunk by chunk until nothing qualifies; `pause` seconds between chunks leaves room for live traffic
+    cutoff = utcnow() - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        moved = await archive_chunk(db, cutoff, chunk_size)
+        if not moved:
+            return archived
+        archived += moved
+        if progress is not None:
+            progress(archived)
+        if pause:
+            await asyncio.sleep(pause)
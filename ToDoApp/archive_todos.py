@@ -0,0 +1,40 @@
+# Move old completed todos to the archive table, a chunk per transaction, e.g. nightly from cron:
+#   python archive_todos.py
+#   python archive_todos.py --older-than-days 30 --chunk-size 1000 --pause 0.5
+import argparse
+import asyncio
+import json
+import sys
+from dotenv import load_dotenv
+load_dotenv()
+from database import AsyncSessionLocal, async_engine
+from archive import archive_completed_todos, TODO_ARCHIVE_AFTER_DAYS, TODO_ARCHIVE_CHUNK_SIZE
+
+
+def _print_progress(archived: int):
+    print(f"{archived} archived", file=sys.stderr, flush=True)
+
+
+async def run(older_than_days: int, chunk_size: int, pause: float) -> int:
+    try:
+        async with AsyncSessionLocal() as db:
+            return await archive_completed_todos(db, older_than_days, chunk_size, pause, progress=_print_progress)
+    finally:
+        await async_engine.dispose() # Pooled aiosqlite connections would otherwise keep the process alive
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive completed todos that haven't changed in a while.")
+    parser.add_argument("--older-than-days", type=int, default=TODO_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=TODO_ARCHIVE_CHUNK_SIZE,
+                        help="Todos per transaction; smaller holds locks for less time")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between chunks")
+    args = parser.parse_args(argv)
+
+    archived = asyncio.run(run(args.older_than_days, args.chunk_size, args.pause))
+    print(json.dumps({"archived": archived}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# Load/benchmark suite: seeds N users x M todos, drives the API in-process through
+# httpx's ASGI transport and reports throughput and latency percentiles per endpoint.
+#
+#   python benchmark.py --users 20 --todos 100,1000,10000 --concurrency 16 --output results.json
+#   python benchmark.py --baseline baseline.json   # exit 1 if p95 regressed beyond --tolerance
+#
+# Uses a throwaway SQLite file; DATABASE_URL is ignored so a configured database is never
+# touched by accident. --database-url picks another target, which is wiped and reseeded for
+# every data volume; anything but SQLite also needs --yes-wipe-database.
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+BENCH_PASSWORD = "benchmark-password"
+DEFAULT_TOLERANCE = 0.25 # Allowed p95 slowdown relative to the baseline
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], errors: int, wall_seconds: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def drive(client, send, total: int, concurrency: int) -> dict:
+    # `concurrency` workers pull request numbers from a shared iterator until `total` have been sent
+    numbers = iter(range(total))
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for number in numbers:
+            started = time.perf_counter()
+            response = await send(client, number)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def seed(engine, users: int, todos_per_user: int) -> list[int]:
+    from sqlalchemy import delete, insert, select
+    from models import ArchivedTodos, Base, RefreshTokens, TodoStats, TodoTombstones, ToDos, Users
+    from passwords import bcrypt_context
+
+    Base.metadata.create_all(bind=engine)
+    hashed_password = bcrypt_context.hash(BENCH_PASSWORD) # One hash shared by every seeded user
+    with engine.begin() as connection:
+        for model in (ToDos, ArchivedTodos, TodoTombstones, TodoStats, RefreshTokens, Users): # Children before users
+            connection.execute(delete(model))
+        connection.execute(insert(Users), [
+            {"username": f"bench{n}", "email": f"bench{n}@example.com", "first_name": "Bench", "last_name": str(n),
+             "hashed_password": hashed_password, "role": "admin" if n == 0 else "user", "is_active": True,
+             "phone_number": "0000000000"}
+            for n in range(users)])
+        user_ids = list(connection.scalars(select(Users.id).order_by(Users.id)))
+        for user_id in user_ids:
+            connection.execute(insert(ToDos), [
+                {"title": f"Todo {n}", "description": f"Benchmark todo {n}", "priority": n % 5 + 1,
+                 "completed": n % 3 == 0, "owner_id": user_id}
+                for n in range(todos_per_user)])
+    return user_ids
+
+
+async def run_scenarios(app, user_ids: list[int], requests: int, login_requests: int, concurrency: int) -> dict:
+    import httpx
+    from routers.auth import create_access_token
+
+    # Tokens are minted directly so bcrypt only shows up in the login scenario
+    headers = [{"Authorization": "Bearer " + create_access_token(
+        f"bench{n}", user_id, "admin" if n == 0 else "user", timedelta(hours=1))}
+        for n, user_id in enumerate(user_ids)]
+    created = []
+    todo = {"title": "Benchmark", "description": "Created by the benchmark", "priority": 3, "completed": False}
+
+    def user_headers(number):
+        return headers[number % len(headers)]
+
+    async def create(client, number):
+        response = await client.post("/todos/todo", json=todo, headers=user_headers(number))
+        if response.status_code == 201:
+            created.append((number, response.json()["id"]))
+        return response
+
+    async def update(client, number):
+        owner, todo_id = created[number % len(created)]
+        return await client.put(f"/todos/todo/{todo_id}", json={**todo, "completed": True}, headers=user_headers(owner))
+
+    async def remove(client, number):
+        owner, todo_id = created[number]
+        return await client.delete(f"/todos/todo/{todo_id}", headers=user_headers(owner))
+
+    scenarios = [
+        ("POST /auth/login", login_requests, lambda client, number: client.post(
+            "/auth/login", json={"username": f"bench{number % len(user_ids)}", "password": BENCH_PASSWORD})),
+        ("GET /todos/", requests, lambda client, number: client.get("/todos/", headers=user_headers(number))),
+        ("GET /todos/?limit=50", requests, lambda client, number: client.get("/todos/?limit=50", headers=user_headers(number))),
+        ("POST /todos/todo", requests, create),
+        ("PUT /todos/todo/{todo_id}", requests, update),
+        ("DELETE /todos/todo/{todo_id}", requests, remove), # Removes what was created, so the volume is unchanged
+        ("GET /admin/todo?limit=100", requests, lambda client, number: client.get("/admin/todo?limit=100", headers=headers[0])),
+    ]
+
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        for name, total, send in scenarios:
+            if send in (update, remove):
+                if not created:
+                    continue # Every create failed; nothing to update or delete (the create errors say why)
+                if send is remove:
+                    total = min(total, len(created))
+            results[name] = await drive(client, send, total, concurrency)
+    return results
+
+
+async def run_benchmark(app, engine, users: int, volumes: list[int], requests: int, login_requests: int,
+                        concurrency: int, progress=None) -> dict:
+    # One event loop for every run: the app's pooled async connections are tied to it
+    runs = []
+    for todos_per_user in volumes:
+        user_ids = seed(engine, users, todos_per_user)
+        results = await run_scenarios(app, user_ids, requests, login_requests, concurrency)
+        runs.append({"users": users, "todos_per_user": todos_per_user, "results": results})
+        if progress is not None:
+            progress(runs[-1])
+    return {"concurrency": concurrency, "requests": requests, "runs": runs}
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    # p95 per (data volume, endpoint); volumes or endpoints missing from the baseline are skipped
+    baseline_runs = {run["todos_per_user"]: run["results"] for run in baseline.get("runs", [])}
+    regressions = []
+    for run in report["runs"]:
+        previous = baseline_runs.get(run["todos_per_user"], {})
+        for endpoint, result in run["results"].items():
+            before = previous.get(endpoint, {}).get("p95_ms")
+            if before and result["p95_ms"] > before * (1 + tolerance):
+                regressions.append(f"{endpoint} @ {run['todos_per_user']} todos/user: "
+                                   f"p95 {result['p95_ms']}ms vs baseline {before}ms")
+    return regressions
+
+
+def _print_run(run: dict):
+    print(f"\n{run['users']} users x {run['todos_per_user']} todos", file=sys.stderr)
+    print(f"{'endpoint':34} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}", file=sys.stderr)
+    for endpoint, result in run["results"].items():
+        print(f"{endpoint:34} {result['throughput_rps']:>9} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+              f"{result['p99_ms']:>9} {result['errors']:>7}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the API in-process.")
+    parser.add_argument("--database-url", help="Database to wipe and seed (default: a temporary SQLite file)")
+    parser.add_argument("--yes-wipe-database", action="store_true",
+                        help="Confirm that a non-SQLite --database-url may be wiped")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--todos", default="100,1000", help="Comma-separated todos per user; one run per value")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--output", help="Write the JSON report here (e.g. to keep as a baseline)")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+    if args.database_url and not args.database_url.startswith("sqlite") and not args.yes_wipe_database:
+        parser.error(f"{args.database_url} would be wiped and reseeded; pass --yes-wipe-database to confirm")
+
+    # The app reads its configuration at import time, so set it up before importing anything
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("AUTH_RATE_LIMIT_BACKEND", "none") # Measure the endpoints, not the limiter
+    os.environ.setdefault("AUTH_MAX_CONCURRENCY", str(max(args.concurrency, 8)))
+    from database import async_engine, engine
+    from main import app
+
+    async def run():
+        try:
+            return await run_benchmark(app, engine, args.users, [int(volume) for volume in args.todos.split(",")],
+                                       args.requests, args.login_requests, args.concurrency, progress=_print_run)
+        finally:
+            await async_engine.dispose() # Pooled aiosqlite connections would otherwise keep the process alive
+
+    report = asyncio.run(run())
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare_to_baseline(report, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
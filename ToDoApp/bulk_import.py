@@ -0,0 +1,217 @@
+import asyncio
+import csv
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+import orjson
+from fastapi import Request
+from pydantic import Field, ValidationError
+from sqlalchemy import select, insert, or_
+from sqlalchemy.exc import IntegrityError
+from exports import ExportFormat
+from models import ToDos, Users
+from passwords import hash_password, password_hasher, PASSWORD_HASH_WORKERS
+from routers.auth import CreateUserRequest
+from routers.todos import ToDoRequest
+from todo_writes import todos_changed, todos_committed
+from stats import stats_delta
+from events import RESYNC
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", str(os.cpu_count() or 1)))
+IMPORT_SPOOL_BYTES = int(os.getenv("IMPORT_SPOOL_BYTES", str(8 * 1024 * 1024))) # Larger uploads spill to disk
+IMPORT_MAX_ERRORS = 100 # Per-record errors kept in the report; the failed counter keeps counting past this
+
+
+class ImportKind(str, Enum):
+    users = "users"
+    todos = "todos"
+
+
+class TodoImportRecord(ToDoRequest):
+    owner_id: int = Field(gt=0)
+
+
+RECORD_MODELS = {
+    ImportKind.users: CreateUserRequest,
+    ImportKind.todos: TodoImportRecord,
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.chunks = 0
+        self.errors = []
+
+    def add_error(self, line: int, detail: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "detail": detail})
+
+    def to_dict(self) -> dict:
+        return {"processed": self.processed, "imported": self.imported, "failed": self.failed,
+                "chunks": self.chunks, "errors": self.errors}
+
+
+_hash_executor = None
+
+def hash_executor() -> ProcessPoolExecutor:
+    # bcrypt dominates an import of users, so the CLI spreads it over every core.
+    # Never used inside the API process: forking there would leak workers past shutdown.
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(max_workers=IMPORT_HASH_WORKERS)
+    return _hash_executor
+
+def shutdown_hash_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown()
+        _hash_executor = None
+
+
+async def _hash_all(passwords: list[str], use_processes: bool) -> list[str]:
+    if use_processes:
+        loop = asyncio.get_running_loop()
+        executor = hash_executor()
+        return await asyncio.gather(*(loop.run_in_executor(executor, hash_password, password) for password in passwords))
+    # Shares the app's bounded bcrypt pool with logins, never more in flight than it has workers.
+    # Waits for capacity rather than being shed: earlier chunks are already committed, and a 503
+    # halfway through would lose the report.
+    hashes = []
+    for start in range(0, len(passwords), PASSWORD_HASH_WORKERS):
+        batch = passwords[start:start + PASSWORD_HASH_WORKERS]
+        hashes += await asyncio.gather(*(password_hasher.hash(password, shed=False) for password in batch))
+    return hashes
+
+
+def iter_records(text, import_format: ExportFormat):
+    # Yields (line, raw_record, parse_error) one record at a time from a text stream
+    if import_format == ExportFormat.csv:
+        reader = csv.DictReader(text)
+        for raw in reader:
+            yield reader.line_num, raw, None
+        return
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            yield line, None, "Invalid JSON."
+            continue
+        if not isinstance(record, dict):
+            yield line, None, "Expected a JSON object."
+            continue
+        yield line, record, None
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+
+async def _insert_users(db, chunk, report: ImportReport, use_processes: bool) -> int:
+    # One lookup per chunk instead of one per user; duplicates within the upload are caught too
+    existing = (await db.execute(select(Users.username, Users.email).filter(or_(
+        Users.username.in_({user.username for _, user in chunk}),
+        Users.email.in_({user.email for _, user in chunk}))))).all()
+    usernames = {row.username for row in existing}
+    emails = {row.email for row in existing}
+
+    accepted = []
+    for line, user in chunk:
+        if user.username in usernames or user.email in emails:
+            report.add_error(line, "Username or email already exists.")
+            continue
+        usernames.add(user.username)
+        emails.add(user.email)
+        accepted.append(user)
+    if not accepted:
+        return 0
+
+    hashes = await _hash_all([user.password for user in accepted], use_processes)
+    await db.execute(insert(Users), [
+        {**user.model_dump(exclude={"password"}), "hashed_password": hashed_password, "is_active": True}
+        for user, hashed_password in zip(accepted, hashes)])
+    await db.commit()
+    return len(accepted)
+
+
+async def _insert_todos(db, chunk, report: ImportReport, use_processes: bool) -> int:
+    owner_ids = set(await db.scalars(select(Users.id).filter(Users.id.in_({todo.owner_id for _, todo in chunk}))))
+
+    accepted = []
+    for line, todo in chunk:
+        if todo.owner_id not in owner_ids:
+            report.add_error(line, "Owner not found.")
+            continue
+        accepted.append(todo)
+    if not accepted:
+        return 0
+
+    touched = {todo.owner_id for todo in accepted}
+    await db.execute(insert(ToDos), [todo.model_dump() for todo in accepted])
+    await todos_changed(db, touched, stats=stats_delta(added=[(todo.owner_id, todo.completed, todo.priority)
+                                                             for todo in accepted]))
+    await db.commit()
+    await todos_committed(touched, [(owner_id, RESYNC) for owner_id in touched])
+    return len(accepted)
+
+
+CHUNK_WRITERS = {
+    ImportKind.users: _insert_users,
+    ImportKind.todos: _insert_todos,
+}
+
+
+async def _write_chunk(db, kind: ImportKind, chunk, report: ImportReport, use_processes: bool):
+    # Each chunk is its own transaction: a bad chunk doesn't undo the ones before it
+    try:
+        report.imported += await CHUNK_WRITERS[kind](db, chunk, report, use_processes)
+    except IntegrityError:
+        await db.rollback() # Lost a race with a concurrent writer; report the whole chunk
+        for line, _ in chunk:
+            report.add_error(line, "Conflicts with an existing record.")
+    report.chunks += 1
+
+
+async def import_records(db, kind: ImportKind, text, import_format: ExportFormat,
+                         chunk_size: int = IMPORT_CHUNK_SIZE, progress=None, use_processes: bool = False) -> ImportReport:
+    # use_processes: hash passwords on a process pool (the CLI); the API stays on password_hasher
+    model = RECORD_MODELS[kind]
+    report = ImportReport()
+    chunk = []
+    for line, raw, error in iter_records(text, import_format):
+        report.processed += 1
+        if error is not None:
+            report.add_error(line, error)
+            continue
+        try:
+            chunk.append((line, model.model_validate(raw)))
+        except ValidationError as exc:
+            report.add_error(line, _validation_detail(exc))
+            continue
+        if len(chunk) >= chunk_size:
+            await _write_chunk(db, kind, chunk, report, use_processes)
+            chunk = []
+            if progress is not None:
+                progress(report)
+    if chunk:
+        await _write_chunk(db, kind, chunk, report, use_processes)
+        if progress is not None:
+            progress(report)
+    return report
+
+
+async def spool_upload(request: Request):
+    # Read the body as it arrives without holding all of it in memory
+    upload = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES, mode="w+b")
+    async for data in request.stream():
+        upload.write(data)
+    upload.seek(0)
+    return io.TextIOWrapper(upload, encoding="utf-8", newline="")
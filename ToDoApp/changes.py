@@ -0,0 +1,76 @@
+import os
+from datetime import timedelta
+from fastapi import HTTPException
+from sqlalchemy import select, insert, update, delete, func, or_
+from starlette import status
+from models import ToDos, TodoTombstones, Users, utcnow
+from schemas import TODO_COLUMNS
+
+# Delta sync. An owner's todos_version doubles as the change sequence: every write
+# stamps the rows it touched (and tombstones for rows it deleted) with the version
+# it bumped to, so "what changed since N" is an index range scan on (owner_id, change_seq).
+
+TODO_TOMBSTONE_RETENTION_DAYS = int(os.getenv("TODO_TOMBSTONE_RETENTION_DAYS", "30"))
+TODO_CHANGES_LIMIT = int(os.getenv("TODO_CHANGES_LIMIT", "1000")) # More changes than this: refetch everything instead
+
+
+def _sync_expired() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_410_GONE, detail="Sync token expired, refetch without since.")
+
+
+async def stamp_changes(db, versions: dict, deleted=()) -> None:
+    # Inside the writer's transaction, right after the version bump. versions: {owner_id: new version};
+    # deleted: (todo_id, owner_id) pairs removed by this transaction.
+    if not versions:
+        return
+    await db.execute(update(ToDos)
+                     .filter(ToDos.owner_id.in_(versions), ToDos.change_seq.is_(None))
+                     .values(change_seq=select(Users.todos_version).filter(Users.id == ToDos.owner_id).scalar_subquery(),
+                             updated_at=ToDos.updated_at)) # Bookkeeping only, not a modification
+    now = utcnow() # One timestamp, so compaction never splits a sequence number
+    tombstones = [{"todo_id": todo_id, "owner_id": owner_id, "change_seq": versions[owner_id], "deleted_at": now}
+                  for todo_id, owner_id in deleted if owner_id in versions]
+    if tombstones:
+        await db.execute(insert(TodoTombstones), tombstones)
+
+
+async def read_changes(db, owner_id: int, since: int | None) -> dict:
+    # The head is read first: anything stamped above it commits later and is picked up by the next call
+    user = (await db.execute(select(Users.todos_version, Users.todos_purged_seq).filter(Users.id == owner_id))).first()
+    head, purged = (user.todos_version, user.todos_purged_seq) if user is not None else (0, 0)
+
+    if since is None:
+        # Full snapshot; also where a client starts, or restarts after a 410
+        rows = (await db.execute(select(*TODO_COLUMNS)
+                                 .filter(ToDos.owner_id == owner_id)
+                                 .filter(or_(ToDos.change_seq.is_(None), ToDos.change_seq <= head))
+                                 .order_by(ToDos.id))).all()
+        return {"changes": rows, "deleted": [], "next_since": head}
+    if since < purged or since > head:
+        raise _sync_expired() # Tombstones the client needs are gone, or the token isn't ours
+
+    rows = (await db.execute(select(*TODO_COLUMNS)
+                             .filter(ToDos.owner_id == owner_id, ToDos.change_seq > since, ToDos.change_seq <= head)
+                             .order_by(ToDos.change_seq, ToDos.id)
+                             .limit(TODO_CHANGES_LIMIT + 1))).all()
+    if len(rows) > TODO_CHANGES_LIMIT:
+        raise _sync_expired()
+    deleted = (await db.scalars(select(TodoTombstones.todo_id)
+                                .filter(TodoTombstones.owner_id == owner_id,
+                                        TodoTombstones.change_seq > since, TodoTombstones.change_seq <= head)
+                                .order_by(TodoTombstones.change_seq))).all()
+    # Clients apply deletions first, then upsert changes (SQLite reused todo ids before AUTOINCREMENT)
+    return {"changes": rows, "deleted": list(deleted), "next_since": head}
+
+
+async def compact_tombstones(db, retention_days: int = TODO_TOMBSTONE_RETENTION_DAYS) -> int:
+    # Drops old tombstones and records, per owner, the newest sequence dropped; tokens older than that get a 410
+    cutoff = utcnow() - timedelta(days=retention_days)
+    purged = (await db.execute(select(TodoTombstones.owner_id, func.max(TodoTombstones.change_seq).label("change_seq"))
+                               .filter(TodoTombstones.deleted_at < cutoff)
+                               .group_by(TodoTombstones.owner_id))).all()
+    if not purged:
+        return 0
+    await db.execute(update(Users), [{"id": row.owner_id, "todos_purged_seq": row.change_seq} for row in purged])
+    result = await db.execute(delete(TodoTombstones).filter(TodoTombstones.deleted_at < cutoff))
+    return result.rowcount
@@ -1,14 +1,175 @@
-# SQLAlchemy is used to manage the database connection and ORM (Object Relational Mapping).  It allows developers to work with database logic using Python objects and classes, abstracting away the need to write raw SQL for most operations. 
-from sqlalchemy import create_engine
+# SQLAlchemy is used to manage the database connection and ORM (Object Relational Mapping).  It allows developers to work with database logic using Python objects and classes, abstracting away the need to write raw SQL for most operations.
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 import os
+import time
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional read replicas, comma-separated; safe GET handlers read from these (see replicas.py)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL) # Create the database engine
+# Pool tuning, shared by every engine built from DATABASE_URL
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Seconds; drop connections before server-side idle timeouts do
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Applied to every new SQLite connection; WAL lets readers proceed while a writer commits
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "temp_store": "MEMORY",
+}
+
+# asyncio drivers used for request handling, keyed by the backend of DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    # Swap the sync driver in DATABASE_URL for its asyncio counterpart
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    if backend == "postgresql" and "sslmode" in url.query:
+        # asyncpg spells libpq's sslmode as ssl
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url.render_as_string(hide_password=False)
+
+
+class PoolMetrics:
+    # Checkout/checkin counters plus time spent waiting for a pooled connection
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        if timed_out:
+            self.timeouts += 1
+
+    def attach(self, engine):
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def snapshot(self, engine) -> dict:
+        stats = {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return stats
+
+
+def _timed_pool_class(base, metrics: PoolMetrics):
+    # Pool events only fire once a connection is handed out, so time the wait in the pool itself
+    class TimedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except PoolTimeoutError:
+                metrics.record_wait(time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.record_wait(time.perf_counter() - start)
+            return connection
+    return TimedPool
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def engine_options(url: str, pool_base, metrics: PoolMetrics) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {} # In-memory SQLite uses a single static connection; nothing to size
+    return {
+        "poolclass": _timed_pool_class(pool_base, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _instrument(engine, metrics: PoolMetrics):
+    metrics.attach(engine)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def build_engine(url: str, metrics: PoolMetrics):
+    return _instrument(create_engine(url, **engine_options(url, QueuePool, metrics)), metrics)
+
+
+def build_async_engine(url: str, metrics: PoolMetrics):
+    url = async_database_url(url)
+    engine = create_async_engine(url, **engine_options(url, AsyncAdaptedQueuePool, metrics))
+    _instrument(engine.sync_engine, metrics)
+    return engine
+
+
+pool_metrics = PoolMetrics() # Request-path (async) pool
+sync_pool_metrics = PoolMetrics() # Startup and scripts
+
+engine = build_engine(SQLALCHEMY_DATABASE_URL, sync_pool_metrics) # Create the database engine (startup and scripts)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) # Session factory
 
-Base = declarative_base() # Base class for our ORM models
+async_engine = build_async_engine(SQLALCHEMY_DATABASE_URL, pool_metrics) # Engine used by the routers
 
+# expire_on_commit=False keeps loaded attributes usable after commit without another round-trip
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# One pool (and one set of pool metrics) per replica; sessions are tagged so handlers can tell
+replica_pool_metrics = [PoolMetrics() for _ in DATABASE_REPLICA_URLS]
+replica_engines = [build_async_engine(url, metrics) for url, metrics in zip(DATABASE_REPLICA_URLS, replica_pool_metrics)]
+ReplicaSessionLocals = [async_sessionmaker(bind=replica_engine, autoflush=False, expire_on_commit=False,
+                                           info={"replica": True})
+                        for replica_engine in replica_engines]
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db # Provide a database session, closed when the request is done
+
+Base = declarative_base() # Base class for our ORM models
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import uuid
+from abc import ABC, abstractmethod
+import orjson
+
+EVENT_BACKEND = os.getenv("EVENT_BACKEND", "memory") # memory | redis
+EVENT_REDIS_URL = os.getenv("EVENT_REDIS_URL", "redis://localhost:6379/0")
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256")) # Per subscriber; a client this far behind is told to resync
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+ADMIN_CHANNEL = "admin"
+RESYNC = {"type": "resync"} # Sent instead of events that were dropped; the client should refetch
+
+
+def user_channel(owner_id: int) -> str:
+    return f"user:{owner_id}"
+
+
+def todo_event(event_type: str, todo: dict) -> dict:
+    # created/updated carry the full todo (TodoOut shape); deleted only needs id and owner_id
+    return {"type": event_type, "todo": todo}
+
+
+class Subscription:
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._loop = asyncio.get_running_loop()
+
+    def deliver(self, event: dict):
+        # Safe to call from any thread or event loop; the put happens on the subscriber's loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(event)
+        else:
+            self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Never block the publisher on a slow client: drop its backlog and ask it to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout: float) -> dict | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None # Caller sends a heartbeat
+
+
+class EventBackend(ABC):
+    # Carries events between workers; every worker fans them out to its own subscribers
+
+    @abstractmethod
+    async def publish(self, message: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def listen(self):
+        # Async iterator over messages published by any worker
+        ...
+
+
+class RedisEventBackend(EventBackend):
+    def __init__(self, client, channel: str = "todo-events"):
+        self.client = client
+        self.channel = channel
+
+    async def publish(self, message: bytes) -> None:
+        await self.client.publish(self.channel, message)
+
+    async def listen(self):
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.unsubscribe(self.channel)
+
+
+class EventBroker:
+    # In-process pub/sub: an idle subscriber is one parked coroutine and an empty queue
+
+    def __init__(self, backend: EventBackend | None):
+        self.backend = backend
+        self.origin = uuid.uuid4().hex # Lets a worker skip its own messages coming back from the backend
+        self.published = 0
+        self._channels = {} # channel -> set[Subscription]
+        self._listener = None
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(channel)
+        self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._channels.get(subscription.channel)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._channels[subscription.channel]
+
+    def subscribers(self) -> int:
+        return sum(len(subscribers) for subscribers in self._channels.values())
+
+    def _fan_out(self, owner_id: int, event: dict):
+        for channel in (user_channel(owner_id), ADMIN_CHANNEL):
+            for subscription in list(self._channels.get(channel, ())):
+                subscription.deliver(event)
+
+    async def publish(self, owner_id: int | None, event: dict):
+        if owner_id is None:
+            return
+        self.published += 1
+        self._fan_out(owner_id, event)
+        if self.backend is not None:
+            await self.backend.publish(orjson.dumps({"origin": self.origin, "owner_id": owner_id, "event": event}))
+
+    async def _listen(self):
+        async for raw in self.backend.listen():
+            message = orjson.loads(raw)
+            if message["origin"] != self.origin:
+                self._fan_out(message["owner_id"], message["event"])
+
+    def start(self):
+        # Called from the app lifespan; only needed when events cross workers
+        if self.backend is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    def stats(self) -> dict:
+        return {"subscribers": self.subscribers(), "published": self.published,
+                "backend": type(self.backend).__name__ if self.backend else None}
+
+
+def build_event_broker() -> EventBroker:
+    if EVENT_BACKEND == "redis":
+        import redis.asyncio # Optional dependency, only needed across workers
+        return EventBroker(RedisEventBackend(redis.asyncio.from_url(EVENT_REDIS_URL)))
+    return EventBroker(None)
+
+
+event_broker = build_event_broker()
@@ -0,0 +1,50 @@
+import csv
+import io
+import os
+from enum import Enum
+import orjson
+from fastapi.responses import StreamingResponse
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv; charset=utf-8",
+}
+
+
+def _ndjson_chunk(rows) -> bytes:
+    return b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def _csv_chunk(rows, header=None) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def _export_chunks(db, query, export_format: ExportFormat):
+    # Server-side cursor: rows arrive EXPORT_BATCH_SIZE at a time and each batch is
+    # written out before the next is fetched, so memory stays flat however big the table is
+    result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    if export_format == ExportFormat.csv:
+        yield _csv_chunk([], header=list(result.keys())) # Header even for an empty export
+    async for rows in result.partitions():
+        yield _ndjson_chunk(rows) if export_format == ExportFormat.ndjson else _csv_chunk(rows)
+
+
+def export_response(db, query, export_format: ExportFormat, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        _export_chunks(db, query, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'},
+    )
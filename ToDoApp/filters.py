@@ -0,0 +1,60 @@
+from enum import Enum
+from typing import Annotated
+from fastapi import Depends, Query
+from sqlalchemy import or_
+from models import ToDos
+from archive import todos_with_archive
+
+
+class TodoSort(str, Enum):
+    id = "id"
+    id_desc = "-id"
+    priority = "priority"
+    priority_desc = "-priority"
+    title = "title"
+    title_desc = "-title"
+
+
+def _like_pattern(term: str) -> str:
+    # Escape LIKE wildcards so user input is matched literally
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class TodoFilters:
+    def __init__(self,
+                 completed: bool | None = None,
+                 priority: int | None = Query(default=None, gt=0, lt=6),
+                 search: str | None = Query(default=None, min_length=1, max_length=100),
+                 sort: TodoSort = TodoSort.id,
+                 include_archived: bool = False):
+        self.completed = completed
+        self.priority = priority
+        self.search = search
+        self.sort = sort
+        self.include_archived = include_archived
+        # What to select from: the hot table, or hot + archived rows with the same column names
+        self.todos = todos_with_archive() if include_archived else ToDos
+
+    @property
+    def sort_column(self):
+        return getattr(self.todos, self.sort.value.lstrip("-"))
+
+    @property
+    def descending(self) -> bool:
+        return self.sort.value.startswith("-")
+
+    def apply(self, query):
+        todos = self.todos
+        if self.completed is not None:
+            query = query.filter(todos.completed == self.completed)
+        if self.priority is not None:
+            query = query.filter(todos.priority == self.priority)
+        if self.search:
+            pattern = _like_pattern(self.search)
+            query = query.filter(or_(todos.title.ilike(pattern, escape="\\"),
+                                     todos.description.ilike(pattern, escape="\\")))
+        return query
+
+
+todo_filters_dependency = Annotated[TodoFilters, Depends()]
@@ -0,0 +1,49 @@
+# Bulk-load users or todos from an NDJSON/CSV file, e.g.:
+#   python import_data.py users customers.csv
+#   python import_data.py todos todos.ndjson --chunk-size 1000
+import argparse
+import asyncio
+import json
+import sys
+from dotenv import load_dotenv
+load_dotenv()
+from database import AsyncSessionLocal, async_engine
+from exports import ExportFormat
+from bulk_import import ImportKind, import_records, shutdown_hash_executor, IMPORT_CHUNK_SIZE
+
+
+def _print_progress(report):
+    print(f"{report.processed} processed, {report.imported} imported, {report.failed} failed",
+          file=sys.stderr, flush=True)
+
+
+async def run(kind: ImportKind, path: str, import_format: ExportFormat, chunk_size: int):
+    text = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+    try:
+        async with AsyncSessionLocal() as db:
+            return await import_records(db, kind, text, import_format, chunk_size, progress=_print_progress,
+                                        use_processes=True)
+    finally:
+        if text is not sys.stdin:
+            text.close()
+        shutdown_hash_executor()
+        await async_engine.dispose() # Pooled aiosqlite connections would otherwise keep the process alive
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import users or todos.")
+    parser.add_argument("kind", choices=[kind.value for kind in ImportKind])
+    parser.add_argument("path", help="NDJSON or CSV file, or - for stdin")
+    parser.add_argument("--format", choices=[export_format.value for export_format in ExportFormat],
+                        help="Defaults to csv for .csv files, ndjson otherwise")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    import_format = ExportFormat(args.format or ("csv" if args.path.endswith(".csv") else "ndjson"))
+    report = asyncio.run(run(ImportKind(args.kind), args.path, import_format, args.chunk_size))
+    print(json.dumps(report.to_dict(), indent=2))
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,45 @@
-from dotenv import load_dotenv
-load_dotenv()
+import os
+from contextlib import asynccontextmanager
+if "DATABASE_URL" not in os.environ:
+    # Deployments configure the environment directly; .env is only for local runs
+    from dotenv import load_dotenv
+    load_dotenv()
 from seed_admin import create_admin_if_not_exists
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from models import Base
-from database import engine, SessionLocal
-from routers import auth, todos, admin, users
+from database import engine, SessionLocal, async_engine, pool_metrics, sync_pool_metrics, replica_engines, replica_pool_metrics
+from routers import auth, todos, admin, users, events
+from todo_cache import todo_cache
+from events import event_broker
+from startup import STARTUP_MODE, check_schema_revision
+from search import ensure_search_index
+from replicas import ReadYourWritesMiddleware, LAST_WRITE_HEADER
+import metrics
+from query_audit import QUERY_AUDIT, QueryAuditMiddleware, query_auditor
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if STARTUP_MODE == "migrated":
+        await check_schema_revision(async_engine) # One query; no reflection, no per-worker seeding
+    else:
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            ensure_search_index(connection) # create_all skips tables that already exist
+        db = SessionLocal()
+        try:
+            create_admin_if_not_exists(db)
+        finally:
+            db.close()
+    event_broker.start()
+    yield
+    await event_broker.stop()
+    await async_engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,22 +51,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER], # The SPA echoes it back to keep its reads on the primary
 )
 
-@app.on_event("startup")
-def startup():
-    Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
-    try:
-        create_admin_if_not_exists(db)
-    finally:
-        db.close()
-        
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+for replica_engine in replica_engines:
+    metrics.instrument_engine(replica_engine.sync_engine)
+if QUERY_AUDIT:
+    query_auditor.attach(engine)
+    query_auditor.attach(async_engine.sync_engine)
+    app.add_middleware(QueryAuditMiddleware, auditor=query_auditor)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(metrics.MetricsMiddleware) # Added last so it is outermost and times the whole stack
+
 @app.get("/healthy")
 def health_check():
     return {"status": "Healthy"}
 
+@app.get("/healthy/db")
+def database_pool_status():
+    return pool_metrics.snapshot(async_engine.sync_engine)
+
+@app.get("/healthy/cache")
+def todo_cache_status():
+    return todo_cache.stats()
+
+@app.get("/healthy/events")
+def event_broker_status():
+    return event_broker.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    pools = {"async": pool_metrics.snapshot(async_engine.sync_engine), "sync": sync_pool_metrics.snapshot(engine)}
+    for n, (replica_engine, replica_metrics) in enumerate(zip(replica_engines, replica_pool_metrics)):
+        pools[f"replica{n}"] = replica_metrics.snapshot(replica_engine.sync_engine)
+    return PlainTextResponse(metrics.render(pools), media_type="text/plain; version=0.0.4")
+
 app.include_router(auth.router)
 app.include_router(todos.router)
 app.include_router(admin.router)
-app.include_router(users.router)
\ No newline at end of file
+app.include_router(users.router)
+app.include_router(events.router)
\ No newline at end of file
@@ -0,0 +1,229 @@
+import bisect
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Minimal in-process metrics in the Prometheus text exposition format (no client library, no push gateway)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _le(bound) -> str:
+    return 'le="%s"' % (bound if isinstance(bound, str) else _number(float(bound)))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        return self.header() + [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+                                for key, value in sorted(self.values.items())]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * len(self.buckets), 0.0, 0] # bucket counts, sum, count
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1 # Stored per bucket; made cumulative when rendered
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, _le(bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, _le('+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class RequestStats:
+    # Work attributed to the request currently being handled
+    __slots__ = ("queries", "query_seconds", "bcrypt_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.bcrypt_seconds = 0.0
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+REQUESTS = Counter("http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Time spent handling a request.", ("method", "route"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled.", ("method",))
+REQUEST_QUERIES = Histogram("http_request_db_queries", "Database statements executed per request.",
+                            ("method", "route"), QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Database time per request.", ("method", "route"))
+REQUEST_BCRYPT_TIME = Histogram("http_request_bcrypt_seconds", "bcrypt time per request that hashed or verified a password.",
+                                ("method", "route"))
+DB_QUERIES = Counter("db_queries_total", "Database statements executed.")
+DB_QUERY_TIME = Counter("db_query_seconds_total", "Time spent executing database statements.")
+BCRYPT_OPERATIONS = Counter("bcrypt_operations_total", "bcrypt hash/verify calls.")
+BCRYPT_TIME = Counter("bcrypt_seconds_total", "Time spent in bcrypt.")
+
+REGISTRY = [REQUESTS, REQUEST_LATENCY, IN_FLIGHT, REQUEST_QUERIES, REQUEST_DB_TIME, REQUEST_BCRYPT_TIME,
+            DB_QUERIES, DB_QUERY_TIME, BCRYPT_OPERATIONS, BCRYPT_TIME]
+
+# PoolMetrics.snapshot() key -> (metric name, type, help)
+POOL_METRICS = {
+    "size": ("db_pool_size", "gauge", "Configured pool size."),
+    "checked_out": ("db_pool_checked_out", "gauge", "Connections currently checked out."),
+    "overflow": ("db_pool_overflow", "gauge", "Connections open beyond pool_size."),
+    "connects": ("db_pool_connects_total", "counter", "New DBAPI connections opened."),
+    "checkouts": ("db_pool_checkouts_total", "counter", "Connection checkouts."),
+    "timeouts": ("db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection."),
+    "wait_seconds_total": ("db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection."),
+    "wait_seconds_max": ("db_pool_wait_seconds_max", "gauge", "Longest wait for a pooled connection."),
+}
+
+
+def record_bcrypt(seconds: float):
+    BCRYPT_OPERATIONS.inc()
+    BCRYPT_TIME.inc(amount=seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.bcrypt_seconds += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_TIME.inc(amount=elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+
+def instrument_engine(engine):
+    # Pass a sync Engine (for an AsyncEngine, its .sync_engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_template(scope) -> str:
+    # The path template keeps label cardinality bounded (/todos/todo/{todo_id}, not every id)
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware: no extra task per request and streaming bodies pass straight through
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec(method)
+            current_request.reset(token)
+            route = _route_template(scope)
+            REQUESTS.inc(method, route, str(status_code))
+            REQUEST_LATENCY.observe(method, route, value=elapsed)
+            REQUEST_QUERIES.observe(method, route, value=stats.queries)
+            REQUEST_DB_TIME.observe(method, route, value=stats.query_seconds)
+            if stats.bcrypt_seconds:
+                REQUEST_BCRYPT_TIME.observe(method, route, value=stats.bcrypt_seconds)
+
+
+def _render_pools(pools: dict) -> list[str]:
+    lines = []
+    for key, (metric, kind, help) in POOL_METRICS.items():
+        samples = [f'{metric}{{pool="{_escape(name)}"}} {_number(snapshot[key])}'
+                   for name, snapshot in pools.items() if key in snapshot]
+        if samples:
+            lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}", *samples]
+    return lines
+
+
+def render(pools: dict | None = None) -> str:
+    # pools: {"async": PoolMetrics.snapshot(...), ...}, sampled at scrape time
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    lines += _render_pools(pools or {})
+    return "\n".join(lines) + "\n"
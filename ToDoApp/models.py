@@ -1,5 +1,9 @@
+from datetime import datetime, timezone
 from database import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index, DateTime, null
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
 
 class Users(Base):
     __tablename__ = "users"
@@ -13,6 +17,11 @@ class Users(Base):
     is_active = Column(Boolean, default=True)
     role = Column(String)
     phone_number = Column(String)
+    version = Column(Integer, nullable=False, default=1, server_default="1") # Bumped on every profile write (ETag)
+    updated_at = Column(DateTime(timezone=True), default=utcnow)
+    todos_version = Column(Integer, nullable=False, default=0, server_default="0") # Bumped on every write to this user's todos
+    todos_updated_at = Column(DateTime(timezone=True))
+    todos_purged_seq = Column(Integer, nullable=False, default=0, server_default="0") # Tombstones up to here were compacted
 
 class ToDos(Base):
     __tablename__ = "todos"
@@ -22,4 +31,74 @@ class ToDos(Base):
     description = Column(String)
     priority = Column(Integer)
     completed = Column(Boolean, default=False)
-    owner_id = Column(Integer, ForeignKey("users.id"))
\ No newline at end of file
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+    # The owner's todos_version of the last write to this row. Writes leave it NULL
+    # and todos_changed stamps it, so no write path has to know the next value.
+    change_seq = Column(Integer, onupdate=null())
+
+    __table_args__ = (
+        # Per-user listings filter on owner_id first; these keep them off a full table scan
+        Index("ix_todos_owner_id_completed_priority", "owner_id", "completed", "priority"),
+        Index("ix_todos_owner_id_id", "owner_id", "id"),
+        Index("ix_todos_owner_id_change_seq", "owner_id", "change_seq"),
+        # SQLite would otherwise reuse the id of a deleted or archived todo
+        {"sqlite_autoincrement": True},
+    )
+
+class TodoStats(Base):
+    # Materialized per-owner counters for the admin dashboard (ADMIN_STATS_MODE=materialized)
+    __tablename__ = "todo_stats"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    priority_1 = Column(Integer, nullable=False, default=0)
+    priority_2 = Column(Integer, nullable=False, default=0)
+    priority_3 = Column(Integer, nullable=False, default=0)
+    priority_4 = Column(Integer, nullable=False, default=0)
+    priority_5 = Column(Integer, nullable=False, default=0)
+
+class ArchivedTodos(Base):
+    # Cold storage for old completed todos (see archive.py); ids are kept from todos
+    __tablename__ = "todos_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String)
+    description = Column(String)
+    priority = Column(Integer)
+    completed = Column(Boolean, default=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_todos_archive_owner_id_id", "owner_id", "id"),
+    )
+
+class TodoTombstones(Base):
+    # Deleted todo ids for /todos/changes; compacted after TODO_TOMBSTONE_RETENTION_DAYS
+    __tablename__ = "todo_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    todo_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_todo_tombstones_owner_id_change_seq", "owner_id", "change_seq"),
+        Index("ix_todo_tombstones_deleted_at", "deleted_at"),
+    )
+
+class RefreshTokens(Base):
+    # Only a SHA-256 of each refresh token is stored; a family is one login's chain of rotations
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    family_id = Column(String, nullable=False, index=True)
+    token_hash = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True))
@@ -0,0 +1,96 @@
+import base64
+import json
+import math
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+def encode_cursor(values: dict) -> str:
+    # Opaque cursor: clients only ever echo it back, they should not parse it
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def cursor_sort(sort_column, descending: bool = False) -> str:
+    # The order a cursor belongs to, e.g. "-priority"; a cursor is only valid for that order
+    return ("-" if descending else "") + sort_column.key
+
+
+def key_types(sort_column) -> tuple:
+    # Python types a cursor key may have for this column
+    try:
+        python_type = sort_column.type.python_type
+    except NotImplementedError: # Untyped expressions, e.g. the search rank
+        return (int, float)
+    return (int, float) if python_type is float else (python_type,)
+
+
+def _is_scalar(value, types: tuple) -> bool:
+    # bool is an int to isinstance; ints must fit a BIGINT and floats be finite, or the query itself fails
+    if isinstance(value, bool) or not isinstance(value, types):
+        return False
+    if isinstance(value, int):
+        return -2 ** 63 <= value < 2 ** 63
+    return not isinstance(value, float) or math.isfinite(value)
+
+
+def decode_cursor(cursor: str, sort: str | None = None, types: tuple | None = None) -> dict:
+    # sort: what cursor_sort gave for the requested order; types: expected key types, when sorting by a key
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if not isinstance(values, dict) or not _is_scalar(values.get("id"), (int,)):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if sort is not None and values.get("sort") != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort.")
+    if types is not None and not _is_scalar(values.get("key"), types):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return values
+
+
+def sort_order(id_column, sort_column=None, descending: bool = False) -> list:
+    # id is always the tie-breaker so the order (and therefore the cursor) is total
+    columns = [id_column] if sort_column is None or sort_column is id_column else [sort_column, id_column]
+    return [column.desc() for column in columns] if descending else columns
+
+
+async def paginate(db, query, id_column, limit: int | None, cursor: str | None,
+                   sort_column=None, descending: bool = False):
+    # Keyset pagination on (sort_column, id): seek past the last row instead of OFFSET,
+    # so every page costs the same no matter how deep it is
+    if sort_column is None:
+        sort_column = id_column
+    sort = cursor_sort(sort_column, descending)
+
+    if cursor is not None:
+        values = decode_cursor(cursor, sort, None if sort_column is id_column else key_types(sort_column))
+        last_id = values["id"]
+        if sort_column is id_column:
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        else:
+            last_key = values["key"]
+            if descending:
+                query = query.filter(or_(sort_column < last_key,
+                                         and_(sort_column == last_key, id_column < last_id)))
+            else:
+                query = query.filter(or_(sort_column > last_key,
+                                         and_(sort_column == last_key, id_column > last_id)))
+
+    query = query.order_by(*sort_order(id_column, sort_column, descending))
+    limit = limit or DEFAULT_PAGE_LIMIT
+    rows = (await db.execute(query.limit(limit + 1))).all() # One extra row tells us if there is a next page
+    items = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        values = {"sort": sort, "id": last.id}
+        if sort_column is not id_column:
+            values["key"] = getattr(last, sort_column.key)
+        next_cursor = encode_cursor(values)
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+from metrics import record_bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", "64"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+# Single bcrypt config for the whole app; hashes with a different cost are flagged by needs_update
+bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+def hash_password(password: str) -> str:
+    # Module-level so it can be shipped to a process pool (bulk imports)
+    return bcrypt_context.hash(password)
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    return func(*args), time.perf_counter() - started
+
+
+class PasswordHasher:
+    # Runs bcrypt on a bounded thread pool so it never blocks the event loop.
+    # bcrypt releases the GIL while hashing, so threads give real parallelism here.
+
+    def __init__(self, context: CryptContext, max_workers: int, max_pending: int, retry_after: int):
+        self.context = context
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    async def _run(self, func, *args, shed: bool = True):
+        # shed=False queues regardless of depth; only for callers that bound their own concurrency
+        if shed and self.pending >= self.max_pending:
+            # Back-pressure: shed load instead of queueing logins behind a long bcrypt backlog
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many authentication requests, try again later.",
+                                headers={"Retry-After": str(self.retry_after)})
+        self.pending += 1
+        try:
+            result, seconds = await asyncio.get_running_loop().run_in_executor(self._executor, _timed, func, *args)
+        finally:
+            self.pending -= 1
+        record_bcrypt(seconds) # Hashing time only, not time spent queued for a worker
+        return result
+
+    async def hash(self, password: str, shed: bool = True) -> str:
+        return await self._run(self.context.hash, password, shed=shed)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        # Returns (valid, new_hash); new_hash is set when the stored cost differs from BCRYPT_ROUNDS
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+
+password_hasher = PasswordHasher(bcrypt_context, PASSWORD_HASH_WORKERS,
+                                 PASSWORD_HASH_QUEUE_DEPTH, PASSWORD_HASH_RETRY_AFTER)
@@ -0,0 +1,165 @@
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Statement auditing for tests and staging: counts per request, flags repeated statements
+# (duplicates / N+1 loops) and logs slow statements together with their query plan.
+# Enabled in the app with QUERY_AUDIT=1; the test suite attaches it to its own engine.
+
+QUERY_AUDIT = os.getenv("QUERY_AUDIT", "0").lower() in ("1", "true", "yes")
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.2"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3")) # Same statement, different parameters, this many times
+
+logger = logging.getLogger("query_audit")
+
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN",
+    "postgresql": "EXPLAIN", # Plan only, never EXPLAIN ANALYZE: the statement is not run again
+}
+
+
+class AuditedQuery:
+    __slots__ = ("statement", "parameters", "seconds", "plan")
+
+    def __init__(self, statement: str, parameters, seconds: float, plan=None):
+        self.statement = statement
+        self.parameters = parameters
+        self.seconds = seconds
+        self.plan = plan
+
+
+class QueryLog:
+    def __init__(self):
+        self.queries = []
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def statements(self) -> list[str]:
+        return [query.statement for query in self.queries]
+
+    def slow(self, threshold: float | None = None) -> list[AuditedQuery]:
+        threshold = SLOW_QUERY_SECONDS if threshold is None else threshold
+        return [query for query in self.queries if query.seconds >= threshold]
+
+    def duplicates(self) -> dict:
+        # Identical statement and parameters more than once: the result could have been reused
+        counts = Counter((query.statement, repr(query.parameters)) for query in self.queries)
+        return {key: count for key, count in counts.items() if count > 1}
+
+    def n_plus_one(self, threshold: int | None = None) -> dict:
+        # The same statement issued for many different parameters, i.e. a query inside a loop
+        threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        variants = {}
+        for query in self.queries:
+            variants.setdefault(query.statement, set()).add(repr(query.parameters))
+        return {statement: len(params) for statement, params in variants.items() if len(params) >= threshold}
+
+    def problems(self) -> list[str]:
+        return ([f"duplicate x{count}: {statement}" for (statement, _), count in self.duplicates().items()] +
+                [f"N+1 x{count}: {statement}" for statement, count in self.n_plus_one().items()])
+
+    def reset(self):
+        self.queries.clear()
+
+
+class QueryAuditor:
+    def __init__(self, slow_query_seconds: float = SLOW_QUERY_SECONDS):
+        self.slow_query_seconds = slow_query_seconds
+        self.current: ContextVar[QueryLog | None] = ContextVar("query_audit_log", default=None)
+        self._captures = [] # Process-wide captures, for callers outside the request's context (tests)
+
+    def attach(self, engine):
+        # Pass a sync Engine (for an AsyncEngine, its .sync_engine)
+        if not event.contains(engine, "before_cursor_execute", self._before):
+            event.listen(engine, "before_cursor_execute", self._before)
+            event.listen(engine, "after_cursor_execute", self._after)
+
+    def detach(self, engine):
+        if event.contains(engine, "before_cursor_execute", self._before):
+            event.remove(engine, "before_cursor_execute", self._before)
+            event.remove(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("audit_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["audit_start"].pop()
+        logs = list(self._captures)
+        request_log = self.current.get()
+        if request_log is not None:
+            logs.append(request_log)
+        if not logs and seconds < self.slow_query_seconds:
+            return
+
+        query = AuditedQuery(statement, parameters, seconds)
+        if seconds >= self.slow_query_seconds:
+            query.plan = None if executemany else self._explain(conn, statement, parameters)
+            logger.warning("Slow query (%.1f ms): %s\nPlan: %s", seconds * 1000, statement, query.plan)
+        for log in logs:
+            log.queries.append(query)
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters):
+        prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            return None
+        # Raw DBAPI cursor so the EXPLAIN itself is not audited (or counted in /metrics). It shares the
+        # request's transaction, so it runs in a savepoint: on Postgres a failed statement would
+        # otherwise abort the transaction and fail the request's next statement.
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT query_audit_explain")
+            try:
+                cursor.execute(f"{prefix} {statement}", parameters)
+                return cursor.fetchall()
+            except Exception as exc:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_audit_explain")
+                return f"EXPLAIN failed: {exc}"
+            finally:
+                cursor.execute("RELEASE SAVEPOINT query_audit_explain")
+        except Exception as exc: # The savepoint itself failed; never let auditing break the request
+            return f"EXPLAIN failed: {exc}"
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def capture(self):
+        log = QueryLog()
+        self._captures.append(log)
+        try:
+            yield log
+        finally:
+            self._captures.remove(log)
+
+
+class QueryAuditMiddleware:
+    # Staging only: one QueryLog per request, problems logged with the route that caused them
+
+    def __init__(self, app, auditor: QueryAuditor):
+        self.app = app
+        self.auditor = auditor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        log = QueryLog()
+        token = self.auditor.current.set(log)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.auditor.current.reset(token)
+            route = getattr(scope.get("route"), "path", scope["path"])
+            for problem in log.problems():
+                logger.warning("%s %s: %s", scope["method"], route, problem)
+            logger.info("%s %s: %d statements", scope["method"], route, log.count)
+
+
+query_auditor = QueryAuditor()
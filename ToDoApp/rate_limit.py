@@ -0,0 +1,160 @@
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, Request
+from starlette import status
+
+AUTH_RATE_LIMIT_BACKEND = os.getenv("AUTH_RATE_LIMIT_BACKEND", "memory") # none | memory | redis
+AUTH_RATE_LIMIT_REDIS_URL = os.getenv("AUTH_RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+AUTH_RATE_LIMIT_MAX_KEYS = int(os.getenv("AUTH_RATE_LIMIT_MAX_KEYS", "100000"))
+# Buckets: burst size, then a steady refill in requests per minute
+AUTH_RATE_LIMIT_IP_BURST = int(os.getenv("AUTH_RATE_LIMIT_IP_BURST", "30"))
+AUTH_RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("AUTH_RATE_LIMIT_IP_PER_MINUTE", "30"))
+AUTH_RATE_LIMIT_USERNAME_BURST = int(os.getenv("AUTH_RATE_LIMIT_USERNAME_BURST", "10"))
+AUTH_RATE_LIMIT_USERNAME_PER_MINUTE = float(os.getenv("AUTH_RATE_LIMIT_USERNAME_PER_MINUTE", "5"))
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes")
+# Password-hashing routes admitted at once, per worker; the rest of the API never waits behind them
+AUTH_MAX_CONCURRENCY = int(os.getenv("AUTH_MAX_CONCURRENCY", "8"))
+AUTH_RETRY_AFTER = int(os.getenv("AUTH_RETRY_AFTER", "1"))
+
+
+class RateLimitBackend(ABC):
+    # Token buckets keyed by string; take() returns (allowed, seconds until enough tokens)
+
+    @abstractmethod
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> tuple[bool, float]:
+        ...
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    # Per-process buckets, so each worker enforces its own share of the limit
+
+    def __init__(self, max_keys: int, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets = OrderedDict() # key -> (tokens, updated)
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> tuple[bool, float]:
+        now = self._clock()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False) # A forgotten bucket is simply full again
+        return allowed, 0.0 if allowed else (1 - tokens) / refill_per_second
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    # Shared between workers; the refill-and-take runs atomically as one Lua script
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit"):
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> tuple[bool, float]:
+        allowed, tokens = await self.client.eval(self.SCRIPT, 1, f"{self.prefix}:{key}",
+                                                 capacity, refill_per_second, time.time())
+        tokens = float(tokens)
+        return bool(int(allowed)), 0.0 if int(allowed) else (1 - tokens) / refill_per_second
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend | None):
+        self.backend = backend
+        self.rejected = 0
+
+    async def check(self, key: str, capacity: int, per_minute: float) -> None:
+        if self.backend is None:
+            return
+        allowed, retry_after = await self.backend.take(key, capacity, per_minute / 60)
+        if not allowed:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                detail="Too many requests, try again later.",
+                                headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class ConcurrencyLimiter:
+    # Admission control: reject immediately when full instead of queueing behind bcrypt
+
+    def __init__(self, limit: int, retry_after: int):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.active = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.active >= self.limit:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many authentication requests, try again later.",
+                                headers={"Retry-After": str(self.retry_after)})
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip() # Only meaningful behind a proxy that sets it
+    return request.client.host if request.client else "unknown"
+
+
+def build_rate_limiter() -> RateLimiter:
+    if AUTH_RATE_LIMIT_BACKEND == "memory":
+        return RateLimiter(InMemoryRateLimitBackend(AUTH_RATE_LIMIT_MAX_KEYS))
+    if AUTH_RATE_LIMIT_BACKEND == "redis":
+        import redis.asyncio # Optional dependency, only needed for the shared backend
+        return RateLimiter(RedisRateLimitBackend(redis.asyncio.from_url(AUTH_RATE_LIMIT_REDIS_URL)))
+    return RateLimiter(None)
+
+
+auth_rate_limiter = build_rate_limiter()
+auth_concurrency = ConcurrencyLimiter(AUTH_MAX_CONCURRENCY, AUTH_RETRY_AFTER)
+
+
+async def limit_auth_request(request: Request, username: str | None = None) -> None:
+    # Per client IP always; per username when the route has one (stops spraying one account from many IPs)
+    await auth_rate_limiter.check(f"ip:{client_ip(request)}", AUTH_RATE_LIMIT_IP_BURST, AUTH_RATE_LIMIT_IP_PER_MINUTE)
+    if username:
+        await auth_rate_limiter.check(f"user:{username.lower()}", AUTH_RATE_LIMIT_USERNAME_BURST,
+                                      AUTH_RATE_LIMIT_USERNAME_PER_MINUTE)
+
+
+@asynccontextmanager
+async def auth_admission(request: Request, username: str | None = None):
+    # Rate limits first, so a client that is already over its limit gets its 429 without
+    # ever holding one of the AUTH_MAX_CONCURRENCY slots
+    await limit_auth_request(request, username)
+    async with auth_concurrency.slot():
+        yield
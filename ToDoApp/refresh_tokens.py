@@ -0,0 +1,76 @@
+import os
+import secrets
+import uuid
+from datetime import timedelta, timezone
+from fastapi import HTTPException
+from sqlalchemy import select, insert, update
+from starlette import status
+from models import RefreshTokens, Users, utcnow
+from token_cache import token_digest
+
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "30"))
+
+# Refresh tokens are random strings, not JWTs: a lookup by SHA-256 is all a refresh costs,
+# and they can be revoked. Each use rotates the token; presenting an already-rotated token
+# means it leaked, so the whole family (every descendant of that login) is revoked.
+
+
+def _invalid() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token.")
+
+
+async def issue_refresh_token(db, user_id: int, family_id: str | None = None) -> str:
+    token = secrets.token_urlsafe(32)
+    await db.execute(insert(RefreshTokens).values(
+        user_id=user_id, family_id=family_id or uuid.uuid4().hex, token_hash=token_digest(token),
+        created_at=utcnow(), expires_at=utcnow() + timedelta(days=REFRESH_TOKEN_DAYS)))
+    return token
+
+
+async def rotate_refresh_token(db, token: str) -> tuple:
+    # Returns (user row, new refresh token); the caller commits
+    row = (await db.execute(
+        select(RefreshTokens.id, RefreshTokens.family_id, RefreshTokens.expires_at, RefreshTokens.revoked_at,
+               Users.id.label("user_id"), Users.username, Users.role, Users.is_active)
+        .join(Users, Users.id == RefreshTokens.user_id)
+        .filter(RefreshTokens.token_hash == token_digest(token)))).first()
+    if row is None:
+        raise _invalid()
+    if row.revoked_at is not None:
+        await revoke_family(db, row.family_id)
+        await db.commit()
+        raise _invalid()
+    expires_at = row.expires_at if row.expires_at.tzinfo else row.expires_at.replace(tzinfo=timezone.utc) # SQLite drops the offset
+    if expires_at <= utcnow() or not row.is_active:
+        raise _invalid()
+
+    # Claim the token atomically: of two concurrent refreshes with the same token only one wins
+    claimed = await db.execute(update(RefreshTokens)
+                               .filter(RefreshTokens.id == row.id, RefreshTokens.revoked_at.is_(None))
+                               .values(revoked_at=utcnow()))
+    if claimed.rowcount != 1:
+        await revoke_family(db, row.family_id)
+        await db.commit()
+        raise _invalid()
+    return row, await issue_refresh_token(db, row.user_id, row.family_id)
+
+
+async def revoke_family(db, family_id: str) -> None:
+    await db.execute(update(RefreshTokens)
+                     .filter(RefreshTokens.family_id == family_id, RefreshTokens.revoked_at.is_(None))
+                     .values(revoked_at=utcnow()))
+
+
+async def revoke_refresh_token(db, token: str) -> None:
+    # Logout: ends that session (its whole family) and nothing else
+    family_id = await db.scalar(select(RefreshTokens.family_id)
+                                .filter(RefreshTokens.token_hash == token_digest(token)))
+    if family_id is not None:
+        await revoke_family(db, family_id)
+
+
+async def revoke_user_refresh_tokens(db, user_id: int) -> None:
+    # Every session of the user, e.g. after a password change
+    await db.execute(update(RefreshTokens)
+                     .filter(RefreshTokens.user_id == user_id, RefreshTokens.revoked_at.is_(None))
+                     .values(revoked_at=utcnow()))
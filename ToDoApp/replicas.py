@@ -0,0 +1,76 @@
+import itertools
+import math
+import os
+import time
+from typing import Annotated
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+import database
+from database import get_db
+
+# Read/write splitting. Safe GET handlers take `read_db_dependency` and read from a replica;
+# everything else keeps using get_db (the primary). After a write, the client carries the
+# write's time back (cookie for browsers on our domain, X-Last-Write header for the SPA), and
+# for REPLICA_PIN_SECONDS its reads stay on the primary so it never reads behind its own write.
+
+REPLICA_PIN_SECONDS = float(os.getenv("REPLICA_PIN_SECONDS", "5")) # Comfortably above normal replication lag
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_next_replica = itertools.count()
+
+
+def last_write_at(headers, cookies) -> float | None:
+    value = headers.get(LAST_WRITE_HEADER.lower()) or cookies.get(LAST_WRITE_COOKIE)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def pinned_to_primary(request: Request) -> bool:
+    written = last_write_at(request.headers, request.cookies)
+    return written is not None and time.time() - written < REPLICA_PIN_SECONDS
+
+
+async def get_read_db(request: Request, db: Annotated[AsyncSession, Depends(get_db)]):
+    # The primary session is only a handle until it runs a statement, so taking it costs no connection
+    session_makers = database.ReplicaSessionLocals
+    if not session_makers or pinned_to_primary(request):
+        yield db
+        return
+    async with session_makers[next(_next_replica) % len(session_makers)]() as replica:
+        yield replica
+
+
+def is_replica(db) -> bool:
+    # Replica reads may lag, so they must not fill shared caches
+    return db.info.get("replica", False)
+
+
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+
+
+class ReadYourWritesMiddleware:
+    # Stamps every successful unsafe request with the time it finished
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not database.ReplicaSessionLocals:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_marker(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                stamp = f"{time.time():.3f}"
+                cookie = f"{LAST_WRITE_COOKIE}={stamp}; Max-Age={math.ceil(REPLICA_PIN_SECONDS)}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [
+                    (LAST_WRITE_HEADER.lower().encode(), stamp.encode()),
+                    (b"set-cookie", cookie.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_marker)
@@ -1,63 +1,116 @@
-from fastapi import HTTPException, Path
+from fastapi import HTTPException, Path, Query
 from typing import Annotated
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from models import ToDos, Users
-from database import SessionLocal
+from database import get_db
+from replicas import read_db_dependency
+from pagination import paginate, sort_order, MAX_PAGE_LIMIT
+from filters import todo_filters_dependency
 from pydantic import BaseModel, Field
 from routers.auth import get_current_user
+from routers.todos import MAX_BATCH_SIZE
+from todo_writes import todos_changed, todos_committed
+from events import todo_event
+from search import search_todos
+from changes import compact_tombstones
+from archive import todo_columns
+from stats import materialized, compute_stats, rebuild_todo_stats, stats_delta, STATS_COLUMNS
+from exports import ExportFormat, export_response
+from bulk_import import ImportKind, import_records, spool_upload, IMPORT_CHUNK_SIZE
+from schemas import TodoOut, TodoPage, TodoSearchPage, UserOut, USER_COLUMNS, rows_response, page_response
 
 router = APIRouter(
     prefix = '/admin',
     tags = ['admin']
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db # Provide a database session
-    finally:
-        db.close() # Ensure the session is closed after use
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
-@router.get("/todo", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+class BatchDeleteRequest(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+@router.get("/todo", status_code=status.HTTP_200_OK, response_model=list[TodoOut] | TodoPage)
+async def read_all(user: user_dependency, db: read_db_dependency,
+                   filters: todo_filters_dependency,
+                   limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_LIMIT),
+                   cursor: str | None = None):
     if user is None or user.get('user_role') != 'admin':
         raise HTTPException(status_code=401, detail="Authentication failed.")
     
-    todos = db.query(ToDos).all()
-    return todos
+    todos = filters.todos
+    query = filters.apply(select(*todo_columns(todos)))
+    if limit is None and cursor is None:
+        # Unpaginated compatibility mode: plain list
+        return rows_response((await db.execute(query.order_by(*sort_order(todos.id, filters.sort_column, filters.descending)))).all())
+    return page_response(await paginate(db, query, todos.id, limit, cursor, filters.sort_column, filters.descending))
+
+@router.get("/todo/export", status_code=status.HTTP_200_OK)
+async def export_todos(user: user_dependency, db: read_db_dependency,
+                       filters: todo_filters_dependency,
+                       owner_id: int | None = Query(default=None, gt=0),
+                       format: ExportFormat = ExportFormat.ndjson):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=401, detail="Authentication failed.")
+
+    # Compliance exports: constant memory no matter how many rows match
+    todos = filters.todos
+    query = filters.apply(select(*todo_columns(todos)))
+    if owner_id is not None:
+        query = query.filter(todos.owner_id == owner_id)
+    return export_response(db, query.order_by(*sort_order(todos.id, filters.sort_column, filters.descending)),
+                           format, "todos")
 
-@router.get("/todo/user/{user_id}", status_code=status.HTTP_200_OK)
+@router.get("/todo/search", status_code=status.HTTP_200_OK, response_model=TodoSearchPage)
+async def search(user: user_dependency, db: read_db_dependency,
+                 q: str = Query(min_length=1, max_length=200),
+                 owner_id: int | None = Query(default=None, gt=0),
+                 limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_LIMIT),
+                 cursor: str | None = None):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=401, detail="Authentication failed.")
+
+    return page_response(await search_todos(db, q, owner_id, limit, cursor))
+
+@router.get("/todo/user/{user_id}", status_code=status.HTTP_200_OK, response_model=list[TodoOut] | TodoPage)
 async def read_todos_by_user(
     user: user_dependency,
-    db: db_dependency,
-    user_id: int = Path(gt=0)
+    db: read_db_dependency,
+    filters: todo_filters_dependency,
+    user_id: int = Path(gt=0),
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str | None = None
 ):
     if user is None or user.get('user_role') != 'admin':
         raise HTTPException(status_code=401, detail="Authentication failed.")
     
-    user_exists = db.query(Users).filter(Users.id == user_id).first()
+    todos = filters.todos
+    query = filters.apply(select(*todo_columns(todos)).filter(todos.owner_id == user_id))
+    paginated = limit is not None or cursor is not None
+    if paginated:
+        page = await paginate(db, query, todos.id, limit, cursor, filters.sort_column, filters.descending)
+        rows = page["items"]
+    else:
+        rows = (await db.execute(query.order_by(*sort_order(todos.id, filters.sort_column, filters.descending)))).all()
 
-    if not user_exists:
+    # Only an empty result needs the existence check, so the common case is a single query
+    if not rows and await db.scalar(select(Users.id).filter(Users.id == user_id)) is None:
         raise HTTPException(status_code=404, detail="User not found")
+    return page_response(page) if paginated else rows_response(rows)
 
-    todos = db.query(ToDos).filter(ToDos.owner_id == user_id).all()
-    return todos
-
-@router.get("/users", status_code=status.HTTP_200_OK)
+@router.get("/users", status_code=status.HTTP_200_OK, response_model=list[UserOut])
 async def get_all_users(
     user: user_dependency,
-    db: db_dependency
+    db: read_db_dependency
 ):
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(status_code=401, detail="Authentication failed.")
 
-    users = db.query(Users).filter(Users.is_active == True).all()
-    return users
+    users = (await db.execute(select(*USER_COLUMNS).filter(Users.is_active == True))).all()
+    return rows_response(users)
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(
@@ -67,9 +120,74 @@ async def delete_todo(
     if user is None or user.get('user_role') != 'admin':
         raise HTTPException(status_code=401, detail="Authentication failed.")
     
-    todo_model = db.query(ToDos).filter(ToDos.id == todo_id).first()
-    if todo_model is None:
+    removed = (await db.execute(delete(ToDos).filter(ToDos.id == todo_id).returning(*STATS_COLUMNS))).first()
+    if removed is None:
         raise HTTPException(status_code=404, detail="ToDo item not found.")
 
-    db.query(ToDos).filter(ToDos.id == todo_id).delete()
-    db.commit()
\ No newline at end of file
+    owner_id = removed.owner_id
+    await todos_changed(db, [owner_id], deleted=[(todo_id, owner_id)], stats=stats_delta([removed]))
+    await db.commit()
+    await todos_committed([owner_id], [(owner_id, todo_event("deleted", {"id": todo_id, "owner_id": owner_id}))])
+
+@router.post("/todo/batch-delete", status_code=status.HTTP_200_OK)
+async def batch_delete_todos(user: user_dependency, db: db_dependency, batch_request: BatchDeleteRequest):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=401, detail="Authentication failed.")
+
+    deleted = (await db.execute(
+        delete(ToDos).filter(ToDos.id.in_(batch_request.ids)).returning(ToDos.id, *STATS_COLUMNS))).all()
+    deleted_ids = {row.id for row in deleted}
+    await todos_changed(db, {row.owner_id for row in deleted}, deleted=[(row.id, row.owner_id) for row in deleted],
+                        stats=stats_delta([(row.owner_id, row.completed, row.priority) for row in deleted]))
+    await db.commit()
+    await todos_committed({row.owner_id for row in deleted},
+                          [(row.owner_id, todo_event("deleted", {"id": row.id, "owner_id": row.owner_id})) for row in deleted])
+
+    return {"results": [
+        {"id": todo_id, "status": status.HTTP_204_NO_CONTENT} if todo_id in deleted_ids
+        else {"id": todo_id, "status": status.HTTP_404_NOT_FOUND, "detail": "ToDo item not found."}
+        for todo_id in batch_request.ids
+    ]}
+
+@router.post("/import/{kind}", status_code=status.HTTP_200_OK)
+async def bulk_import(request: Request, user: user_dependency, db: db_dependency,
+                      kind: ImportKind,
+                      format: ExportFormat = ExportFormat.ndjson,
+                      chunk_size: int = Query(default=IMPORT_CHUNK_SIZE, ge=1, le=MAX_BATCH_SIZE * 10)):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=401, detail="Authentication failed.")
+
+    # The body is the raw NDJSON/CSV file; records are validated and written chunk by chunk
+    upload = await spool_upload(request)
+    try:
+        report = await import_records(db, kind, upload, format, chunk_size)
+    finally:
+        upload.close()
+    return report.to_dict()
+
+@router.get("/stats", status_code=status.HTTP_200_OK)
+async def read_stats(user: user_dependency, db: read_db_dependency):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=401, detail="Authentication failed.")
+
+    # Live mode is one GROUP BY over todos; materialized mode reads one row per user
+    return await compute_stats(db, use_materialized=materialized())
+
+@router.post("/stats/rebuild", status_code=status.HTTP_204_NO_CONTENT)
+async def rebuild_stats(user: user_dependency, db: db_dependency):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=401, detail="Authentication failed.")
+
+    # Backfill (or repair) the materialized counters from the todos table
+    await rebuild_todo_stats(db)
+    await db.commit()
+
+@router.post("/tombstones/compact", status_code=status.HTTP_200_OK)
+async def compact_todo_tombstones(user: user_dependency, db: db_dependency):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=401, detail="Authentication failed.")
+
+    # Meant for a periodic job; clients holding a token older than what was dropped get a 410 and resync
+    removed = await compact_tombstones(db)
+    await db.commit()
+    return {"removed": removed}
@@ -1,11 +1,15 @@
 from datetime import timedelta, datetime, timezone
 from typing import Annotated
-from database import SessionLocal
-from fastapi import APIRouter, Depends, HTTPException
+from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from models import Users
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from passwords import bcrypt_context, password_hasher
+from token_cache import token_cache
+from rate_limit import auth_admission
+from refresh_tokens import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import jwt, JWTError
@@ -19,7 +23,8 @@ router = APIRouter(
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "20"))
+
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 class CreateUserRequest(BaseModel):
@@ -34,26 +39,28 @@ class CreateUserRequest(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class LoginRequest(BaseModel):
     username: str
     password: str
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db # Provide a database session
-    finally:
-        db.close() # Ensure the session is closed after use
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
-db_dependency = Annotated[Session, Depends(get_db)]
-
-def authenticate_user(username: str, password: str, db):
-    user = db.query(Users).filter(Users.username == username).first()
+async def authenticate_user(username: str, password: str, db):
+    user = await db.scalar(select(Users).filter(Users.username == username))
     if not user:
         return False
-    if not bcrypt_context.verify(password, user.hashed_password):
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash is not None:
+        # Stored hash uses a different bcrypt cost than configured: upgrade it transparently
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 def create_access_token(username: str, user_id: int, role: str, expires_delta: timedelta):
@@ -63,6 +70,9 @@ def create_access_token(username: str, user_id: int, role: str, expires_delta: t
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
+    principal = await token_cache.get(token) # Skip signature verification for tokens we have already checked
+    if principal is not None:
+        return principal
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -70,61 +80,77 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
         user_role: str = payload.get("role")
         if username is None or user_id is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user.")
-        return {"username": username, "id": user_id, "user_role": user_role}
+        principal = {"username": username, "id": user_id, "user_role": user_role}
+        if payload.get("exp") is not None:
+            await token_cache.set(token, principal, payload["exp"]) # Cached until the token expires
+        return principal
 
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user.")
 
+async def issue_tokens(db, user) -> dict:
+    # A password sign-in starts a new refresh-token family; later renewals go through /auth/refresh
+    refresh_token = await issue_refresh_token(db, user.id)
+    await db.commit()
+    token = create_access_token(user.username, user.id, user.role, timedelta(minutes=ACCESS_TOKEN_MINUTES))
+    return {"access_token": token, "token_type": "bearer", "refresh_token": refresh_token}
+
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-async def create_user(db: db_dependency,
+async def create_user(request: Request, db: db_dependency,
                       create_user_request: CreateUserRequest):
-    create_user_model = Users(email=create_user_request.email,
-                              username=create_user_request.username,
-                              first_name=create_user_request.first_name,
-                              last_name=create_user_request.last_name,
-                              hashed_password=bcrypt_context.hash(create_user_request.password),
-                              role=create_user_request.role,
-                              is_active=True,
-                              phone_number=create_user_request.phone_number)
-
-    db.add(create_user_model)
-    db.commit()
+    async with auth_admission(request, create_user_request.username):
+        create_user_model = Users(email=create_user_request.email,
+                                  username=create_user_request.username,
+                                  first_name=create_user_request.first_name,
+                                  last_name=create_user_request.last_name,
+                                  hashed_password=await password_hasher.hash(create_user_request.password),
+                                  role=create_user_request.role,
+                                  is_active=True,
+                                  phone_number=create_user_request.phone_number)
+
+        db.add(create_user_model)
+        await db.commit()
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+async def login_for_access_token(request: Request, form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
                                  db: db_dependency):
-    user = authenticate_user(form_data.username, form_data.password, db)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user.")
-    
-    token = create_access_token(user.username, user.id, user.role, timedelta(minutes=20))
-    return {"access_token": token, "token_type": "bearer"}
+    async with auth_admission(request, form_data.username):
+        user = await authenticate_user(form_data.username, form_data.password, db)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user.")
+        
+        return await issue_tokens(db, user)
 
 @router.post("/login", response_model=Token)
 async def login_json(
+    request: Request,
     login_request: LoginRequest,
     db: db_dependency
 ):
-    user = authenticate_user(
-        login_request.username,
-        login_request.password,
-        db
-    )
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials"
+    async with auth_admission(request, login_request.username):
+        user = await authenticate_user(
+            login_request.username,
+            login_request.password,
+            db
         )
 
-    token = create_access_token(
-        user.username,
-        user.id,
-        user.role,
-        timedelta(minutes=20)
-    )
-
-    return {
-        "access_token": token,
-        "token_type": "bearer"
-    }
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid credentials"
+            )
+
+        return await issue_tokens(db, user)
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(refresh_request: RefreshRequest, db: db_dependency):
+    # No bcrypt here: one indexed lookup by token hash, then rotation
+    row, refresh_token = await rotate_refresh_token(db, refresh_request.refresh_token)
+    await db.commit()
+    token = create_access_token(row.username, row.user_id, row.role, timedelta(minutes=ACCESS_TOKEN_MINUTES))
+    return {"access_token": token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(refresh_request: RefreshRequest, db: db_dependency):
+    await revoke_refresh_token(db, refresh_request.refresh_token)
+    await db.commit()
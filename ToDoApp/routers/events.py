@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from jose import jwt
+import orjson
+import time
+from starlette import status
+from routers.auth import get_current_user
+from events import event_broker, user_channel, ADMIN_CHANNEL, EVENT_HEARTBEAT_SECONDS
+
+router = APIRouter(
+    prefix='/events',
+    tags=['events']
+)
+
+# Browsers can't set headers on EventSource or WebSocket, so the access token may also come
+# as ?access_token=. Only use that over HTTPS; the token is short-lived, and a stream is
+# closed once it expires so the client has to reconnect with a fresh one.
+
+async def stream_principal(authorization: str | None, access_token: str | None) -> tuple[dict, float | None]:
+    # (principal, expiry as a UNIX timestamp)
+    if authorization and authorization.lower().startswith("bearer "):
+        access_token = authorization[7:]
+    if not access_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user.")
+    user = await get_current_user(access_token)
+    return user, jwt.get_unverified_claims(access_token).get("exp") # Already verified above
+
+def until_expiry(expires_at: float | None, heartbeat: float) -> float | None:
+    # How long to wait for the next event; None once the token has expired
+    if expires_at is None:
+        return heartbeat
+    remaining = expires_at - time.time()
+    return min(heartbeat, remaining) if remaining > 0 else None
+
+def channel_for(user: dict) -> str:
+    # Admins see every todo event, everyone else only their own
+    return ADMIN_CHANNEL if user.get("user_role") == "admin" else user_channel(user.get("id"))
+
+def sse_message(event: dict) -> bytes:
+    return b"event: " + event["type"].encode() + b"\ndata: " + orjson.dumps(event) + b"\n\n"
+
+async def sse_stream(subscription, heartbeat: float = EVENT_HEARTBEAT_SECONDS, expires_at: float | None = None):
+    try:
+        yield b"retry: 5000\n\n"
+        while (timeout := until_expiry(expires_at, heartbeat)) is not None:
+            event = await subscription.get(timeout)
+            # A comment line keeps proxies from closing an idle connection
+            yield b": keep-alive\n\n" if event is None else sse_message(event)
+    finally:
+        event_broker.unsubscribe(subscription)
+
+@router.get("/todos", status_code=status.HTTP_200_OK)
+async def todo_events(request: Request, access_token: str | None = None):
+    user, expires_at = await stream_principal(request.headers.get("authorization"), access_token)
+    subscription = event_broker.subscribe(channel_for(user))
+    return StreamingResponse(sse_stream(subscription, expires_at=expires_at), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/todos/ws")
+async def todo_events_ws(websocket: WebSocket, access_token: str | None = None):
+    try:
+        user, expires_at = await stream_principal(websocket.headers.get("authorization"), access_token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = event_broker.subscribe(channel_for(user))
+    try:
+        while (timeout := until_expiry(expires_at, EVENT_HEARTBEAT_SECONDS)) is not None:
+            event = await subscription.get(timeout)
+            if event is None:
+                await websocket.send_json({"type": "ping"})
+            else:
+                await websocket.send_text(orjson.dumps(event).decode())
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION) # Token expired
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_broker.unsubscribe(subscription)
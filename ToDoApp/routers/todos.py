@@ -1,26 +1,34 @@
-from fastapi import HTTPException, Path
-from typing import Annotated
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, Path, Query
+from typing import Annotated, Literal
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from models import ToDos
-from database import SessionLocal
-from pydantic import BaseModel, Field
+from models import ToDos, Users, ArchivedTodos
+from database import get_db
+from replicas import read_db_dependency, is_replica
+from pagination import paginate, sort_order, MAX_PAGE_LIMIT
+from filters import todo_filters_dependency
+from pydantic import BaseModel, Field, model_validator
 from routers.auth import get_current_user
+from schemas import TodoOut, TodoPage, TodoSearchPage, TodoChanges, rows_response, page_response, changes_response
+from versioning import make_etag, not_modified, validator_headers
+from todo_writes import todos_changed, todos_committed
+from stats import stats_rows, stats_delta, STATS_COLUMNS
+from events import todo_event, RESYNC
+from todo_cache import todo_cache, CachedResponse
+from fastapi.responses import ORJSONResponse
+from exports import ExportFormat, export_response
+from search import search_todos
+from changes import read_changes
+from archive import todo_columns
 
 router = APIRouter(
     prefix='/todos',
     tags=['todos']
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db # Provide a database session
-    finally:
-        db.close() # Ensure the session is closed after use
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 class ToDoRequest(BaseModel):
@@ -29,62 +37,230 @@ class ToDoRequest(BaseModel):
     priority: int = Field(gt=0, lt=6)
     completed: bool
 
+MAX_BATCH_SIZE = 500
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "complete", "delete"]
+    id: int | None = Field(default=None, gt=0)
+    todo: ToDoRequest | None = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.op != "create" and self.id is None:
+            raise ValueError(f"'{self.op}' operations require an id")
+        if self.op in ("create", "update") and self.todo is None:
+            raise ValueError(f"'{self.op}' operations require a todo")
+        return self
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency): # Endpoint to read all ToDo items
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=list[TodoOut] | TodoPage)
+async def read_all(request: Request, user: user_dependency, db: read_db_dependency, # Endpoint to read all ToDo items
+                   filters: todo_filters_dependency,
+                   limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_LIMIT),
+                   cursor: str | None = None):
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized to create ToDo item")
     
-    todos = db.query(ToDos).filter(ToDos.owner_id == user.get("id")).all()
-    return todos
+    cache_key = f"list:{request.url.query}"
+    entry, generation = await todo_cache.lookup(user.get("id"), cache_key)
+    if entry is not None:
+        return entry.to_response(request) # Served without touching the database
+
+    # The owner's list version decides freshness, so an unchanged poll never loads or serializes rows
+    version = (await db.execute(select(Users.todos_version, Users.todos_updated_at)
+                                .filter(Users.id == user.get("id")))).first()
+    etag = last_modified = None
+    headers = {}
+    if version is not None:
+        etag, last_modified = make_etag("todos", user.get("id"), version.todos_version, request.url.query), version.todos_updated_at
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+        headers = validator_headers(etag, last_modified)
+
+    todos = filters.todos # Includes archived rows with ?include_archived=true
+    query = filters.apply(select(*todo_columns(todos)).filter(todos.owner_id == user.get("id")))
+    if limit is None and cursor is None:
+        # Unpaginated compatibility mode: plain list
+        response = rows_response((await db.execute(query.order_by(*sort_order(todos.id, filters.sort_column, filters.descending)))).all())
+    else:
+        response = page_response(await paginate(db, query, todos.id, limit, cursor, filters.sort_column, filters.descending))
+    response.headers.update(headers)
+    if not is_replica(db):
+        await todo_cache.store(user.get("id"), cache_key, CachedResponse(response.body, etag, last_modified), generation)
+    return response
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_todos(user: user_dependency, db: read_db_dependency,
+                       filters: todo_filters_dependency,
+                       format: ExportFormat = ExportFormat.ndjson):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized to create ToDo item")
+
+    # Streamed straight from the cursor; bypasses the response cache on purpose
+    todos = filters.todos
+    query = filters.apply(select(*todo_columns(todos)).filter(todos.owner_id == user.get("id")))
+    return export_response(db, query.order_by(*sort_order(todos.id, filters.sort_column, filters.descending)),
+                           format, "todos")
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=TodoSearchPage)
+async def search(user: user_dependency, db: read_db_dependency,
+                 q: str = Query(min_length=1, max_length=200),
+                 limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_LIMIT),
+                 cursor: str | None = None):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized to create ToDo item")
+
+    # Best matches first; uses the full-text index instead of the LIKE scan behind ?search=
+    return page_response(await search_todos(db, q, user.get("id"), limit, cursor))
 
-@router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK)
-async def read_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
+@router.get("/changes", status_code=status.HTTP_200_OK, response_model=TodoChanges)
+async def read_changes_since(user: user_dependency, db: db_dependency, since: int | None = Query(default=None, ge=0)):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized to create ToDo item")
+
+    # Incremental refresh: costs what changed, not the size of the list. No since (or a 410) means a full snapshot.
+    # Stays on the primary: a lagging replica would see tokens from the future and force full resyncs.
+    return changes_response(await read_changes(db, user.get("id"), since))
+
+@router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoOut)
+async def read_todo(request: Request, user: user_dependency, db: read_db_dependency, todo_id: int = Path(gt=0),
+                    include_archived: bool = False):
 
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized to create ToDo item")
     
-    todo_model = db.query(ToDos).filter(ToDos.id == todo_id).filter(ToDos.owner_id == user.get("id")).first()
+    cache_key = f"todo:{todo_id}:archived" if include_archived else f"todo:{todo_id}"
+    entry, generation = await todo_cache.lookup(user.get("id"), cache_key)
+    if entry is not None:
+        return entry.to_response(request)
+
+    todo_model = await db.scalar(select(ToDos).filter(ToDos.id == todo_id).filter(ToDos.owner_id == user.get("id")))
+    if todo_model is None and include_archived:
+        # The archive is only consulted on a miss, so hot reads cost the same as before
+        todo_model = await db.scalar(select(ArchivedTodos).filter(ArchivedTodos.id == todo_id)
+                                     .filter(ArchivedTodos.owner_id == user.get("id")))
     if todo_model is not None:
-        return todo_model
+        response = ORJSONResponse(TodoOut.model_validate(todo_model).model_dump())
+        if not is_replica(db):
+            await todo_cache.store(user.get("id"), cache_key, CachedResponse(response.body), generation)
+        return response
     raise HTTPException(status_code=404, detail="ToDo item not found")
 
-@router.post("/todo", status_code=status.HTTP_201_CREATED)
+@router.post("/todo", status_code=status.HTTP_201_CREATED, response_model=TodoOut)
 async def create_todo(user: user_dependency,db: db_dependency, todo_request: ToDoRequest):
 
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized to create ToDo item")
     
-    todo_model = ToDos(**todo_request.dict(), owner_id=user.get("id"))
+    todo_model = ToDos(**todo_request.model_dump(), owner_id=user.get("id"))
     db.add(todo_model)
-    db.commit()
+    await todos_changed(db, [user.get("id")],
+                        stats=stats_delta(added=[(todo_model.owner_id, todo_model.completed, todo_model.priority)]))
+    event = todo_event("created", TodoOut.model_validate(todo_model).model_dump())
+    await db.commit()
+    await todos_committed([user.get("id")], [(user.get("id"), event)])
+    return todo_model # Clients can append this instead of re-fetching the list
 
-@router.put("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.put("/todo/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoOut)
 async def update_todo(user: user_dependency, db: db_dependency, 
                       todo_request: ToDoRequest, 
                       todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized to create ToDo item")
     
-    todo_model = db.query(ToDos).filter(ToDos.id == todo_id).filter(ToDos.owner_id == user.get("id")).first()
+    # Single UPDATE ... RETURNING: no SELECT first (except for materialized stats), a missing
+    # (or foreign) row simply matches nothing
+    before = await stats_rows(db, ToDos.id == todo_id, ToDos.owner_id == user.get("id"))
+    todo_model = await db.scalar(
+        update(ToDos).filter(ToDos.id == todo_id).filter(ToDos.owner_id == user.get("id"))
+        .values(**todo_request.model_dump()).returning(ToDos))
     if todo_model is None:
         raise HTTPException(status_code=404, detail="ToDo item not found")
     
-    todo_model.title = todo_request.title
-    todo_model.description = todo_request.description
-    todo_model.priority = todo_request.priority
-    todo_model.completed = todo_request.completed
-    db.add(todo_model)
-    db.commit()
+    await todos_changed(db, [user.get("id")],
+                        stats=stats_delta(before, [(todo_model.owner_id, todo_model.completed, todo_model.priority)]))
+    event = todo_event("updated", TodoOut.model_validate(todo_model).model_dump())
+    await db.commit()
+    await todos_committed([user.get("id")], [(user.get("id"), event)])
+    return todo_model
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized to create ToDo item")
     
-    todo_model = db.query(ToDos).filter(ToDos.id == todo_id).filter(ToDos.owner_id == user.get("id")).first()
-    if todo_model is None:
+    removed = (await db.execute(delete(ToDos).filter(ToDos.id == todo_id).filter(ToDos.owner_id == user.get("id"))
+                                .returning(*STATS_COLUMNS))).all()
+    if not removed:
         raise HTTPException(status_code=404, detail="ToDo item not found")
     
-    db.query(ToDos).filter(ToDos.id == todo_id).delete()
-    db.commit()
\ No newline at end of file
+    await todos_changed(db, [user.get("id")], deleted=[(todo_id, user.get("id"))], stats=stats_delta(removed))
+    await db.commit()
+    await todos_committed([user.get("id")], [(user.get("id"), todo_event("deleted", {"id": todo_id, "owner_id": user.get("id")}))])
+
+@router.post("/batch", status_code=status.HTTP_200_OK)
+async def batch_todos(user: user_dependency, db: db_dependency, batch_request: BatchRequest):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized to create ToDo item")
+
+    owner_id = user.get("id")
+    operations = batch_request.operations
+    results = [{"index": index, "op": operation.op, "id": operation.id} for index, operation in enumerate(operations)]
+
+    # One query resolves ownership for every id in the batch
+    requested_ids = {operation.id for operation in operations if operation.id is not None}
+    owned_ids = set()
+    if requested_ids:
+        owned_ids = set((await db.scalars(
+            select(ToDos.id).filter(ToDos.id.in_(requested_ids)).filter(ToDos.owner_id == owner_id))).all())
+
+    creates, updates, completes, deletes = [], [], [], []
+    seen_ids = set()
+    for index, operation in enumerate(operations):
+        if operation.op == "create":
+            creates.append(index)
+        elif operation.id not in owned_ids:
+            results[index].update(status=status.HTTP_404_NOT_FOUND, detail="ToDo item not found")
+        elif operation.id in seen_ids:
+            # Statements are grouped by type, so a second operation on the same id has no defined order
+            results[index].update(status=status.HTTP_409_CONFLICT, detail="Duplicate id in batch")
+        else:
+            seen_ids.add(operation.id)
+            {"update": updates, "complete": completes, "delete": deletes}[operation.op].append(index)
+
+    modified_ids = [operations[index].id for index in updates + completes]
+    removed = await stats_rows(db, ToDos.id.in_(modified_ids)) if modified_ids else []
+    added = [(owner_id, operations[index].todo.completed, operations[index].todo.priority) for index in creates + updates]
+    if creates:
+        new_ids = (await db.scalars(
+            insert(ToDos).returning(ToDos.id, sort_by_parameter_order=True),
+            [{**operations[index].todo.model_dump(), "owner_id": owner_id} for index in creates])).all()
+        for index, new_id in zip(creates, new_ids):
+            results[index].update(id=new_id, status=status.HTTP_201_CREATED)
+    if updates:
+        # ORM bulk UPDATE by primary key: a single executemany
+        await db.execute(update(ToDos), [{"id": operations[index].id, **operations[index].todo.model_dump()}
+                                         for index in updates])
+    if completes:
+        added += (await db.execute(update(ToDos).filter(ToDos.id.in_([operations[index].id for index in completes]))
+                                   .values(completed=True).returning(*STATS_COLUMNS))).all()
+    if deletes:
+        removed += (await db.execute(delete(ToDos).filter(ToDos.id.in_([operations[index].id for index in deletes]))
+                                     .returning(*STATS_COLUMNS))).all()
+    changed = bool(creates or updates or completes or deletes)
+    if changed:
+        await todos_changed(db, [owner_id], deleted=[(operations[index].id, owner_id) for index in deletes],
+                            stats=stats_delta(removed, added))
+    await db.commit()
+    # One resync instead of an event per row: a batch can touch hundreds of todos
+    await todos_committed([owner_id], [(owner_id, RESYNC)] if changed else ())
+
+    for index in updates + completes:
+        results[index]["status"] = status.HTTP_200_OK
+    for index in deletes:
+        results[index]["status"] = status.HTTP_204_NO_CONTENT
+    return {"results": results}
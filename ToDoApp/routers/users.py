@@ -1,39 +1,48 @@
 from fastapi import HTTPException, Path
 from typing import Annotated
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from models import ToDos, Users
-from database import SessionLocal
+from database import get_db
+from replicas import read_db_dependency
 from pydantic import BaseModel, Field
 from routers.auth import get_current_user
-from passlib.context import CryptContext
+from schemas import UserOut, USER_COLUMNS
+from versioning import touch_user, make_etag, not_modified, validator_headers
+from fastapi.responses import ORJSONResponse
+from passwords import password_hasher
+from refresh_tokens import revoke_user_refresh_tokens
 
 router = APIRouter(
     prefix = '/user',
     tags = ['user']
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db # Provide a database session
-    finally:
-        db.close() # Ensure the session is closed after use
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class UserVerfication(BaseModel):
     current_password: str
     new_password: str = Field(min_length=6)
 
-@router.get('/', status_code=status.HTTP_200_OK)
-async def get_user(user: user_dependency, db: db_dependency):
+@router.get('/', status_code=status.HTTP_200_OK, response_model=UserOut)
+async def get_user(request: Request, user: user_dependency, db: read_db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed.")
-    return db.query(Users).filter(Users.id == user.get('id')).first()
+
+    row = (await db.execute(select(*USER_COLUMNS, Users.version, Users.updated_at)
+                            .filter(Users.id == user.get('id')))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    etag = make_etag("user", row.id, row.version)
+    cached = not_modified(request, etag, row.updated_at)
+    if cached is not None:
+        return cached
+    profile = {column.key: getattr(row, column.key) for column in USER_COLUMNS}
+    return ORJSONResponse(profile, headers=validator_headers(etag, row.updated_at))
 
 @router.put("/password", status_code=status.HTTP_204_NO_CONTENT)
 async def update_password(
@@ -43,14 +52,16 @@ async def update_password(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed.")
     
-    user_model = db.query(Users).filter(Users.id == user.get('id')).first()
-    if not bcrypt_context.verify(user_verification.current_password, user_model.hashed_password):
+    user_model = await db.scalar(select(Users).filter(Users.id == user.get('id')))
+    if not await password_hasher.verify(user_verification.current_password, user_model.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect password.")
 
-    hashed_new_password = bcrypt_context.hash(user_verification.new_password)
+    hashed_new_password = await password_hasher.hash(user_verification.new_password)
     user_model.hashed_password = hashed_new_password
+    touch_user(user_model)
     db.add(user_model)
-    db.commit()
+    await revoke_user_refresh_tokens(db, user_model.id) # Sessions started with the old password end here
+    await db.commit()
 
 @router.put("/phonenumber/{phone_number}", status_code=status.HTTP_204_NO_CONTENT)
 async def change_phone_number(
@@ -60,7 +71,8 @@ async def change_phone_number(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed.")
     
-    user_model = db.query(Users).filter(Users.id == user.get('id')).first()
+    user_model = await db.scalar(select(Users).filter(Users.id == user.get('id')))
     user_model.phone_number = phone_number
+    touch_user(user_model)
     db.add(user_model)
-    db.commit()
\ No newline at end of file
+    await db.commit()
\ No newline at end of file
@@ -0,0 +1,68 @@
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict
+from models import ToDos, Users
+
+
+class TodoOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str | None
+    description: str | None
+    priority: int | None
+    completed: bool | None
+    owner_id: int | None
+
+
+class TodoPage(BaseModel):
+    items: list[TodoOut]
+    next_cursor: str | None
+
+
+class TodoSearchHit(TodoOut):
+    rank: float # Lower is a better match
+
+
+class TodoSearchPage(BaseModel):
+    items: list[TodoSearchHit]
+    next_cursor: str | None
+
+
+class TodoChanges(BaseModel):
+    changes: list[TodoOut] # Created or modified since the token
+    deleted: list[int] # Ids deleted since the token; apply before `changes`
+    next_since: int # Pass back as ?since= next time
+
+
+class UserOut(BaseModel):
+    # Deliberately has no hashed_password
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    email: str | None
+    username: str | None
+    first_name: str | None
+    last_name: str | None
+    is_active: bool | None
+    role: str | None
+    phone_number: str | None
+
+
+# Column tuples for the list fast path: select exactly what the response needs,
+# no ORM identity map and no per-row model validation
+TODO_COLUMNS = tuple(getattr(ToDos, name) for name in TodoOut.model_fields)
+USER_COLUMNS = tuple(getattr(Users, name) for name in UserOut.model_fields)
+
+
+def rows_response(rows) -> ORJSONResponse:
+    return ORJSONResponse([row._asdict() for row in rows])
+
+
+def changes_response(changes: dict) -> ORJSONResponse:
+    return ORJSONResponse({"changes": [row._asdict() for row in changes["changes"]],
+                           "deleted": changes["deleted"], "next_since": changes["next_since"]})
+
+
+def page_response(page: dict) -> ORJSONResponse:
+    return ORJSONResponse({"items": [row._asdict() for row in page["items"]],
+                           "next_cursor": page["next_cursor"]})
@@ -0,0 +1,84 @@
+import re
+from fastapi import HTTPException
+from sqlalchemy import select, func, event, table, column, literal_column
+from models import ToDos
+from pagination import paginate
+from schemas import TODO_COLUMNS
+
+# Full-text search over todo title + description. The index is maintained by the
+# database itself (FTS5 triggers on SQLite, an expression GIN index on Postgres),
+# so every write path - single, batch, admin, bulk import - keeps it in sync.
+
+MAX_SEARCH_TERMS = 10
+
+SEARCH_DDL = {
+    "sqlite": [
+        # External-content table: the text lives in todos only, the FTS table holds just the index
+        "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5("
+        "title, description, content='todos', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN "
+        "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN "
+        "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+        # Only text changes reindex; toggling completed or priority doesn't touch the index
+        "CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF title, description ON todos BEGIN "
+        "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    ],
+    "postgresql": [
+        # Queries must use exactly this expression (SEARCH_VECTOR) for the planner to pick the index
+        "CREATE INDEX IF NOT EXISTS ix_todos_search ON todos USING gin "
+        "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')))",
+    ],
+}
+
+SEARCH_VECTOR = literal_column("to_tsvector('simple', coalesce(todos.title, '') || ' ' || coalesce(todos.description, ''))")
+todos_fts = table("todos_fts", column("rowid"), column("rank")) # Not in the metadata: create_all must not build it
+
+
+def ensure_search_index(connection) -> None:
+    # Idempotent; on SQLite a newly created index is backfilled from the existing todos
+    dialect = connection.dialect.name
+    created = dialect == "sqlite" and connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE name = 'todos_fts'").first() is None
+    for statement in SEARCH_DDL.get(dialect, ()):
+        connection.exec_driver_sql(statement)
+    if created:
+        connection.exec_driver_sql("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+
+@event.listens_for(ToDos.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    ensure_search_index(connection)
+
+
+def search_terms(text: str) -> list[str]:
+    # Words only: operators and quotes in user input never reach MATCH / to_tsquery
+    terms = re.findall(r"\w+", text)[:MAX_SEARCH_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no searchable terms.")
+    return terms
+
+
+def search_query(dialect: str, text: str):
+    # TODO_COLUMNS plus `rank`, lower is better. Every term must match, each as a prefix.
+    terms = search_terms(text)
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        return (select(*TODO_COLUMNS, todos_fts.c.rank.label("rank"))
+                .select_from(todos_fts).join(ToDos, ToDos.id == todos_fts.c.rowid)
+                .filter(literal_column("todos_fts").op("MATCH")(match)))
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+        return (select(*TODO_COLUMNS, (-func.ts_rank(SEARCH_VECTOR, tsquery)).label("rank"))
+                .filter(SEARCH_VECTOR.op("@@")(tsquery)))
+    raise HTTPException(status_code=501, detail="Search is not supported on this database.")
+
+
+async def search_todos(db, text: str, owner_id: int | None, limit: int | None, cursor: str | None) -> dict:
+    # Ranked keyset pagination: the cursor carries (rank, id) of the last hit
+    query = search_query(db.bind.dialect.name, text)
+    if owner_id is not None:
+        query = query.filter(ToDos.owner_id == owner_id)
+    hits = query.subquery("hits")
+    return await paginate(db, select(hits), hits.c.id, limit, cursor, hits.c.rank)
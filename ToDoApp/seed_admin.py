@@ -1,10 +1,11 @@
 import os
+if "DATABASE_URL" not in os.environ:
+    # Must run before `models` builds the engine; .env is only for local runs
+    from dotenv import load_dotenv
+    load_dotenv()
 from sqlalchemy.orm import Session
 from models import Users
-from passlib.context import CryptContext
-
-# Use the SAME bcrypt config as auth.py
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from passwords import bcrypt_context  # Same bcrypt config (and cost) as the auth routes
 
 
 def create_admin_if_not_exists(db: Session):
@@ -38,3 +39,13 @@ def create_admin_if_not_exists(db: Session):
 
     db.add(admin_user)
     db.commit()
+
+
+if __name__ == "__main__":
+    # Run once per deployment, after `alembic upgrade head`, when workers use STARTUP_MODE=migrated
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        create_admin_if_not_exists(db)
+    finally:
+        db.close()
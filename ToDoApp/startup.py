@@ -0,0 +1,30 @@
+import os
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# create_all: create missing tables and seed the admin on every boot (local development)
+# migrated: the deploy has already run `alembic upgrade head` and `python seed_admin.py`;
+#           workers only confirm the schema revision, with a single query
+STARTUP_MODE = os.getenv("STARTUP_MODE", "create_all")
+
+
+def expected_revision() -> str:
+    # Read from the migration scripts on disk; no database access
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory.from_config(Config(os.path.join(BASE_DIR, "alembic.ini"))).get_current_head()
+
+
+async def check_schema_revision(async_engine, expected: str | None = None) -> str:
+    expected = expected or expected_revision()
+    try:
+        async with async_engine.connect() as connection:
+            current = await connection.scalar(text("SELECT version_num FROM alembic_version"))
+    except DBAPIError:
+        current = None # No alembic_version table: migrations have never run
+    if current != expected:
+        raise RuntimeError(f"Database schema is at revision {current}, expected {expected}. "
+                           "Run `alembic upgrade head` before starting the app.")
+    return current
@@ -0,0 +1,91 @@
+import os
+from sqlalchemy import select, delete, insert, case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from models import ToDos, TodoStats
+
+ADMIN_STATS_MODE = os.getenv("ADMIN_STATS_MODE", "live") # live | materialized
+
+PRIORITIES = range(1, 6)
+COUNTER_COLUMNS = ("total", "completed", *(f"priority_{priority}" for priority in PRIORITIES))
+STATS_COLUMNS = (ToDos.owner_id, ToDos.completed, ToDos.priority) # What a todo contributes to the counters
+UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def materialized() -> bool:
+    return ADMIN_STATS_MODE == "materialized"
+
+
+def _aggregate(owner_ids=None):
+    # One GROUP BY pass computes every counter for every owner
+    query = select(
+        ToDos.owner_id,
+        func.count().label("total"),
+        func.coalesce(func.sum(case((ToDos.completed == True, 1), else_=0)), 0).label("completed"),
+        *(func.coalesce(func.sum(case((ToDos.priority == priority, 1), else_=0)), 0).label(f"priority_{priority}")
+          for priority in PRIORITIES),
+    ).filter(ToDos.owner_id.isnot(None)).group_by(ToDos.owner_id)
+    if owner_ids is not None:
+        query = query.filter(ToDos.owner_id.in_(owner_ids))
+    return query
+
+
+def _counters(values) -> dict:
+    return {"total": values["total"], "completed": values["completed"],
+            "by_priority": {str(priority): values[f"priority_{priority}"] for priority in PRIORITIES}}
+
+
+async def compute_stats(db, use_materialized: bool = False) -> dict:
+    if use_materialized:
+        rows = (await db.execute(select(TodoStats.owner_id, *(getattr(TodoStats, name) for name in COUNTER_COLUMNS))
+                                 .filter(TodoStats.total > 0).order_by(TodoStats.owner_id))).all()
+    else:
+        rows = (await db.execute(_aggregate().order_by(ToDos.owner_id))).all()
+
+    totals = dict.fromkeys(COUNTER_COLUMNS, 0)
+    for row in rows:
+        for name in COUNTER_COLUMNS:
+            totals[name] += row._mapping[name]
+    users = [{"owner_id": row.owner_id, **_counters(row._mapping)} for row in rows]
+    return {"global": _counters(totals), "users": users}
+
+
+async def stats_rows(db, *criteria) -> list:
+    # STATS_COLUMNS of the todos a write is about to change, read before it changes them.
+    # Only needed (and only queried) in materialized mode; locks the rows on Postgres.
+    if not materialized():
+        return []
+    return (await db.execute(select(*STATS_COLUMNS).filter(*criteria).with_for_update())).all()
+
+
+def stats_delta(removed=(), added=()) -> dict:
+    # {owner_id: {counter: change}} from (owner_id, completed, priority) rows leaving and
+    # entering the counts; an update removes its old row and adds its new one
+    deltas = {}
+    for sign, rows in ((-1, removed), (1, added)):
+        for owner_id, completed, priority in rows:
+            if owner_id is None:
+                continue
+            counters = deltas.setdefault(owner_id, dict.fromkeys(COUNTER_COLUMNS, 0))
+            counters["total"] += sign
+            if completed:
+                counters["completed"] += sign
+            if priority in PRIORITIES:
+                counters[f"priority_{priority}"] += sign
+    return deltas
+
+
+async def apply_todo_stats(db, deltas: dict) -> None:
+    # Adds a write's deltas to the counters inside its transaction; one upsert, no recount
+    changes = [{"owner_id": owner_id, **counters} for owner_id, counters in deltas.items() if any(counters.values())]
+    if not changes:
+        return
+    upsert = UPSERTS[db.bind.dialect.name](TodoStats)
+    await db.execute(upsert.on_conflict_do_update(
+        index_elements=[TodoStats.owner_id],
+        set_={name: getattr(TodoStats, name) + getattr(upsert.excluded, name) for name in COUNTER_COLUMNS}), changes)
+
+
+async def rebuild_todo_stats(db) -> None:
+    # Recount from scratch: the backfill, and the repair path if the counters ever drift
+    await db.execute(delete(TodoStats))
+    await db.execute(insert(TodoStats).from_select(["owner_id", *COUNTER_COLUMNS], _aggregate()))
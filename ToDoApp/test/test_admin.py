@@ -1,5 +1,8 @@
 from .utils import *
 from fastapi import status
+from datetime import datetime, timezone
+from .. import stats
+from ..models import TodoTombstones
 from ..routers.admin import get_db, get_current_user
 
 app.dependency_overrides[get_db] = override_get_db
@@ -21,7 +24,165 @@ def test_admin_read_all_authenticated(test_todo):
         model = db.query(ToDos).filter(ToDos.id == 1).first()
         assert model is None
 
+def test_admin_read_all_paginated(test_todo):
+    response = client.get("/admin/todo?limit=1")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'items': [{'completed': False,
+                                          'description': 'This is a test todo item',
+                                          'id': 1, 'owner_id': 1,
+                                          'priority': 1, 'title': 'Test ToDo'}],
+                               'next_cursor': None}
+
 def test_admin_delete_todo_not_found():
     response = client.delete("/admin/todo/9999")
     assert response.status_code == 404
-    assert response.json() == {"detail": "ToDo item not found."}
\ No newline at end of file
+    assert response.json() == {"detail": "ToDo item not found."}
+
+def test_admin_batch_delete(test_todo):
+    response = client.post("/admin/todo/batch-delete", json={"ids": [1, 9999]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"results": [
+        {"id": 1, "status": 204},
+        {"id": 9999, "status": 404, "detail": "ToDo item not found."},
+    ]}
+
+    db = TestingSessionLocal()
+    assert db.query(ToDos).filter(ToDos.id == 1).first() is None
+
+def test_admin_get_all_users(test_user):
+    response = client.get("/admin/users")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{'id': test_user.id, 'email': 'poorvig45@gmail.com', 'username': 'poorv',
+                                'first_name': 'poorvi', 'last_name': 'goel', 'is_active': True,
+                                'role': 'admin', 'phone_number': '1234567890'}]
+
+def seed_stats_todos():
+    db = TestingSessionLocal()
+    db.add(ToDos(title="Second", description="Second todo item", priority=3, completed=True, owner_id=1))
+    db.add(ToDos(title="Third", description="Third todo item", priority=3, completed=False, owner_id=2))
+    db.commit()
+
+expected_stats = {
+    "global": {"total": 3, "completed": 1, "by_priority": {"1": 1, "2": 0, "3": 2, "4": 0, "5": 0}},
+    "users": [
+        {"owner_id": 1, "total": 2, "completed": 1, "by_priority": {"1": 1, "2": 0, "3": 1, "4": 0, "5": 0}},
+        {"owner_id": 2, "total": 1, "completed": 0, "by_priority": {"1": 0, "2": 0, "3": 1, "4": 0, "5": 0}},
+    ],
+}
+
+def test_admin_stats(test_todo):
+    seed_stats_todos()
+    response = client.get("/admin/stats")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == expected_stats
+
+def test_admin_stats_materialized(test_todo, monkeypatch):
+    monkeypatch.setattr(stats, "ADMIN_STATS_MODE", "materialized")
+    seed_stats_todos()
+    assert client.post("/admin/stats/rebuild").status_code == status.HTTP_204_NO_CONTENT
+    assert client.get("/admin/stats").json() == expected_stats
+
+    # Writes keep the counters current without another rebuild
+    client.post("/todos/todo", json={"title": "Fourth", "description": "Fourth todo item", "priority": 5, "completed": False})
+    client.delete("/admin/todo/3")
+    body = client.get("/admin/stats").json()
+    assert body["global"] == {"total": 3, "completed": 1, "by_priority": {"1": 1, "2": 0, "3": 1, "4": 0, "5": 1}}
+    assert [user["owner_id"] for user in body["users"]] == [1]
+
+    # Completion and priority changes move counts between buckets, matching a full recount
+    client.put("/todos/todo/1", json={"title": "Test ToDo", "description": "Reprioritized", "priority": 2, "completed": True})
+    client.post("/todos/batch", json={"operations": [{"op": "complete", "id": 4}, {"op": "delete", "id": 2},
+                                                     {"op": "update", "id": 1, "todo": {"title": "Test ToDo",
+                                                      "description": "Again", "priority": 4, "completed": True}}]})
+    body = client.get("/admin/stats").json()
+    assert body["global"] == {"total": 2, "completed": 2, "by_priority": {"1": 0, "2": 0, "3": 0, "4": 1, "5": 1}}
+    assert client.post("/admin/stats/rebuild").status_code == status.HTTP_204_NO_CONTENT
+    assert client.get("/admin/stats").json() == body
+
+    with engine.connect() as connection:
+        connection.execute(text("DELETE FROM todo_stats"))
+        connection.commit()
+
+def test_admin_read_todos_by_unknown_user():
+    response = client.get("/admin/todo/user/9999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == {"detail": "User not found"}
+
+def test_admin_export_todos(test_todo):
+    db = TestingSessionLocal()
+    db.add(ToDos(title="Other user", description="Owned by user 2", priority=3, completed=True, owner_id=2))
+    db.commit()
+
+    response = client.get("/admin/todo/export")
+    assert response.status_code == status.HTTP_200_OK
+    assert [line.split(',')[0] for line in response.text.splitlines()] == ['{"id":1', '{"id":2']
+
+    response = client.get("/admin/todo/export?format=csv&owner_id=2")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text.splitlines() == ["id,title,description,priority,completed,owner_id",
+                                          "2,Other user,Owned by user 2,3,True,2"]
+
+def test_admin_bulk_import_users(test_user):
+    upload = "\n".join([
+        '{"username": "alice", "email": "alice@example.com", "first_name": "Alice", "last_name": "A", '
+        '"password": "alicepass", "role": "user", "phone_number": "111"}',
+        '{"username": "poorv", "email": "other@example.com", "first_name": "Dup", "last_name": "D", '
+        '"password": "duppass", "role": "user", "phone_number": "222"}',
+        'not json',
+        '{"username": "bob"}',
+        '',
+    ])
+    response = client.post("/admin/import/users", content=upload)
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert (report["processed"], report["imported"], report["failed"], report["chunks"]) == (4, 1, 3, 1)
+    assert [error["line"] for error in report["errors"]] == [3, 4, 2]
+    assert report["errors"][0]["detail"] == "Invalid JSON."
+    assert report["errors"][2]["detail"] == "Username or email already exists."
+
+    db = TestingSessionLocal()
+    alice = db.query(Users).filter(Users.username == "alice").first()
+    assert alice.is_active
+    assert bcrypt_context.verify("alicepass", alice.hashed_password)
+
+def test_admin_bulk_import_todos_csv(test_user, test_todo):
+    upload = ("title,description,priority,completed,owner_id\n"
+              f"Imported one,First import,2,false,{test_user.id}\n"
+              f"Imported two,Second import,3,true,{test_user.id}\n"
+              "Orphan,No such owner,1,false,9999\n"
+              f"Bad,Priority out of range,9,false,{test_user.id}\n")
+    response = client.post("/admin/import/todos?format=csv&chunk_size=1", content=upload)
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert (report["processed"], report["imported"], report["failed"], report["chunks"]) == (4, 2, 2, 3)
+    assert report["errors"][0] == {"line": 4, "detail": "Owner not found."}
+    assert report["errors"][1]["line"] == 5 and report["errors"][1]["detail"].startswith("priority")
+
+    db = TestingSessionLocal()
+    todos = db.query(ToDos).filter(ToDos.title.startswith("Imported")).order_by(ToDos.id).all()
+    assert [(todo.title, todo.priority, todo.completed, todo.owner_id) for todo in todos] == [
+        ("Imported one", 2, False, test_user.id), ("Imported two", 3, True, test_user.id)]
+
+def test_admin_search_todos(test_todo):
+    db = TestingSessionLocal()
+    db.add(ToDos(title="Foreign todo", description="Owned by another user", priority=1, completed=False, owner_id=2))
+    db.commit()
+
+    response = client.get("/admin/todo/search?q=todo")
+    assert response.status_code == status.HTTP_200_OK
+    assert {todo["owner_id"] for todo in response.json()["items"]} == {1, 2}
+
+    response = client.get("/admin/todo/search?q=todo&owner_id=2")
+    assert [todo["title"] for todo in response.json()["items"]] == ["Foreign todo"]
+
+def test_admin_compact_tombstones(test_user, test_todo):
+    client.delete(f"/admin/todo/{test_todo.id}")
+    db = TestingSessionLocal()
+    assert [row.todo_id for row in db.query(TodoTombstones)] == [test_todo.id]
+
+    assert client.post("/admin/tombstones/compact").json() == {"removed": 0} # Still within retention
+    db.query(TodoTombstones).update({"deleted_at": datetime(2000, 1, 1, tzinfo=timezone.utc)})
+    db.commit()
+    assert client.post("/admin/tombstones/compact").json() == {"removed": 1}
+    assert db.query(TodoTombstones).count() == 0
+    db.close()
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from fastapi import status
+from .utils import *
+from ..archive import archive_completed_todos
+from ..models import ArchivedTodos
+from ..routers.todos import get_db, get_current_user
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_current_user] = override_get_current_user
+
+LONG_AGO = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+@pytest.fixture
+def aged_todos(test_user, test_todo):
+    # test_todo (open) plus an old completed, a recent completed and a foreign old completed todo
+    db = TestingSessionLocal()
+    db.add_all([
+        ToDos(title="Old done", description="Finished long ago", priority=2, completed=True, owner_id=1, updated_at=LONG_AGO),
+        ToDos(title="Recent done", description="Finished today", priority=2, completed=True, owner_id=1),
+        ToDos(title="Foreign old done", description="Someone else's", priority=2, completed=True, owner_id=2, updated_at=LONG_AGO),
+    ])
+    db.commit()
+    db.close()
+    yield
+    with engine.connect() as connection:
+        connection.execute(text("DELETE FROM todos_archive"))
+        connection.commit()
+
+def run_archive(**kwargs):
+    async def archive():
+        async with TestingAsyncSessionLocal() as db:
+            return await archive_completed_todos(db, **kwargs)
+    return asyncio.run(archive())
+
+def test_archive_moves_old_completed_todos(aged_todos):
+    assert run_archive(older_than_days=30, chunk_size=1) == 2 # One transaction per todo here
+    assert run_archive(older_than_days=30) == 0
+
+    db = TestingSessionLocal()
+    assert sorted(todo.title for todo in db.query(ToDos)) == ["Recent done", "Test ToDo"]
+    assert sorted(todo.title for todo in db.query(ArchivedTodos)) == ["Foreign old done", "Old done"]
+    db.close()
+
+def test_include_archived_reads(aged_todos):
+    run_archive(older_than_days=30)
+    archived_id = TestingSessionLocal().query(ArchivedTodos).filter(ArchivedTodos.owner_id == 1).one().id
+
+    assert [todo["title"] for todo in client.get("/todos").json()] == ["Test ToDo", "Recent done"]
+    response = client.get("/todos?include_archived=true")
+    assert [todo["title"] for todo in response.json()] == ["Test ToDo", "Old done", "Recent done"]
+    response = client.get("/todos?include_archived=true&completed=true&limit=1")
+    page = response.json()
+    assert [todo["title"] for todo in page["items"]] == ["Old done"]
+    page = client.get(f"/todos?include_archived=true&completed=true&limit=1&cursor={page['next_cursor']}").json()
+    assert [todo["title"] for todo in page["items"]] == ["Recent done"]
+
+    assert client.get(f"/todos/todo/{archived_id}").status_code == status.HTTP_404_NOT_FOUND
+    response = client.get(f"/todos/todo/{archived_id}?include_archived=true")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["title"] == "Old done"
+
+    response = client.get("/admin/todo?include_archived=true&completed=true")
+    assert sorted(todo["title"] for todo in response.json()) == ["Foreign old done", "Old done", "Recent done"]
+    response = client.get("/admin/todo/user/2?include_archived=true")
+    assert [todo["title"] for todo in response.json()] == ["Foreign old done"]
+
+def test_archived_todos_leave_the_change_feed(aged_todos):
+    token = client.get("/todos/changes").json()["next_since"]
+    run_archive(older_than_days=30)
+    response = client.get(f"/todos/changes?since={token}").json()
+    assert len(response["deleted"]) == 1
+
+def test_new_todo_never_reuses_an_archived_id(aged_todos):
+    run_archive(older_than_days=30)
+    archived_ids = {todo.id for todo in TestingSessionLocal().query(ArchivedTodos)}
+    assert max(archived_ids) == 4 # The newest todo went to the archive
+
+    response = client.post("/todos/todo", json={"title": "After archive", "description": "Gets a fresh id",
+                                                "priority": 3, "completed": False})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["id"] == 5
+    response = client.get("/todos?include_archived=true")
+    assert sorted(todo["title"] for todo in response.json()) == ["After archive", "Old done", "Recent done", "Test ToDo"]
@@ -4,20 +4,25 @@ from jose import jwt
 from datetime import timedelta
 import pytest
 from fastapi import HTTPException
+from passlib.context import CryptContext
+from ..token_cache import token_cache
+from ..models import RefreshTokens, utcnow
+from ..passwords import password_hasher
 
 app.dependency_overrides[get_db] = override_get_db
 
-def test_authenticate_user(test_user):
-    db = TestingSessionLocal()
-    user = authenticate_user(test_user.username, "testpassword", db)
-    assert user is not None
-    assert user.username == test_user.username
+@pytest.mark.asyncio
+async def test_authenticate_user(test_user):
+    async with TestingAsyncSessionLocal() as db:
+        user = await authenticate_user(test_user.username, "testpassword", db)
+        assert user is not None
+        assert user.username == test_user.username
 
-    non_existent_user = authenticate_user("wronguser", "testpassword", db)
-    assert non_existent_user is False
+        non_existent_user = await authenticate_user("wronguser", "testpassword", db)
+        assert non_existent_user is False
 
-    wrong_password_user = authenticate_user(test_user.username, "wrongpassword", db)
-    assert wrong_password_user is False
+        wrong_password_user = await authenticate_user(test_user.username, "wrongpassword", db)
+        assert wrong_password_user is False
 
 def test_create_access_token():
     username = 'testuser'
@@ -51,4 +56,85 @@ async def test_get_current_user_missing_payload():
         await get_current_user(token=token)
 
     assert excinfo.value.status_code == 401
-    assert excinfo.value.detail == 'Could not validate user.'
\ No newline at end of file
+    assert excinfo.value.detail == 'Could not validate user.'
+@pytest.mark.asyncio
+async def test_authenticate_user_rehashes_outdated_cost(test_user):
+    db = TestingSessionLocal()
+    model = db.query(Users).filter(Users.id == test_user.id).first()
+    model.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("testpassword")
+    db.commit()
+
+    async with TestingAsyncSessionLocal() as async_db:
+        user = await authenticate_user(test_user.username, "testpassword", async_db)
+    assert user is not False
+
+    db.expire_all()
+    model = db.query(Users).filter(Users.id == test_user.id).first()
+    assert not bcrypt_context.needs_update(model.hashed_password)
+    assert bcrypt_context.verify("testpassword", model.hashed_password)
+
+@pytest.mark.asyncio
+async def test_get_current_user_uses_token_cache():
+    token = create_access_token('testuser', 1, 'user', timedelta(minutes=5))
+    token_cache.clear()
+    hits = token_cache.hits
+
+    assert await get_current_user(token=token) == {'username': 'testuser', 'id': 1, 'user_role': 'user'}
+    assert await get_current_user(token=token) == {'username': 'testuser', 'id': 1, 'user_role': 'user'}
+    assert token_cache.hits == hits + 1
+
+@pytest.fixture
+def signed_in(test_user):
+    with engine.connect() as connection:
+        connection.execute(text("DELETE FROM refresh_tokens"))
+        connection.commit()
+    response = client.post("/auth/login", json={"username": test_user.username, "password": "testpassword"})
+    assert response.status_code == 200
+    yield response.json()
+    with engine.connect() as connection:
+        connection.execute(text("DELETE FROM refresh_tokens"))
+        connection.commit()
+
+def test_login_returns_refresh_token(signed_in):
+    assert signed_in["token_type"] == "bearer"
+    assert signed_in["refresh_token"]
+    db = TestingSessionLocal()
+    stored = db.query(RefreshTokens).one()
+    assert stored.token_hash != signed_in["refresh_token"] # Only the hash is kept
+
+def test_refresh_rotates_without_bcrypt(signed_in, monkeypatch):
+    async def no_bcrypt(*args):
+        raise AssertionError("refresh must not hash or verify passwords")
+    monkeypatch.setattr(password_hasher, "verify_and_update", no_bcrypt)
+    monkeypatch.setattr(password_hasher, "hash", no_bcrypt)
+
+    response = client.post("/auth/refresh", json={"refresh_token": signed_in["refresh_token"]})
+    assert response.status_code == 200
+    renewed = response.json()
+    assert renewed["refresh_token"] != signed_in["refresh_token"]
+    payload = jwt.decode(renewed["access_token"], SECRET_KEY, algorithms=[ALGORITHM])
+    assert (payload["sub"], payload["role"]) == ("poorv", "admin")
+
+    response = client.post("/auth/refresh", json={"refresh_token": renewed["refresh_token"]})
+    assert response.status_code == 200
+
+def test_refresh_token_reuse_revokes_family(signed_in):
+    renewed = client.post("/auth/refresh", json={"refresh_token": signed_in["refresh_token"]}).json()
+
+    # The rotated-out token shows up again: treat it as stolen and end the whole session
+    response = client.post("/auth/refresh", json={"refresh_token": signed_in["refresh_token"]})
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid refresh token."}
+    assert client.post("/auth/refresh", json={"refresh_token": renewed["refresh_token"]}).status_code == 401
+
+def test_refresh_token_expired_or_unknown(signed_in):
+    db = TestingSessionLocal()
+    db.query(RefreshTokens).update({RefreshTokens.expires_at: utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert client.post("/auth/refresh", json={"refresh_token": signed_in["refresh_token"]}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": "not-a-token"}).status_code == 401
+
+def test_logout_revokes_refresh_token(signed_in):
+    response = client.post("/auth/logout", json={"refresh_token": signed_in["refresh_token"]})
+    assert response.status_code == 204
+    assert client.post("/auth/refresh", json={"refresh_token": signed_in["refresh_token"]}).status_code == 401
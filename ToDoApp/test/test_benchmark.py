@@ -0,0 +1,64 @@
+import asyncio
+from fastapi import FastAPI, Response
+from .utils import *
+from .. import benchmark
+from ..routers.todos import get_db, get_current_user
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_current_user] = override_get_current_user
+
+def test_percentile():
+    values = [float(n) for n in range(1, 101)]
+    assert benchmark.percentile(values, 0.50) == 50
+    assert benchmark.percentile(values, 0.95) == 95
+    assert benchmark.percentile(values, 0.99) == 99
+    assert benchmark.percentile([], 0.99) == 0.0
+
+def test_compare_to_baseline():
+    baseline = {"runs": [{"todos_per_user": 10, "results": {"GET /todos/": {"p95_ms": 10.0}}}]}
+    report = {"runs": [{"todos_per_user": 10, "results": {"GET /todos/": {"p95_ms": 12.0},
+                                                          "GET /new": {"p95_ms": 99.0}}},
+                       {"todos_per_user": 1000, "results": {"GET /todos/": {"p95_ms": 50.0}}}]}
+    assert benchmark.compare_to_baseline(report, baseline, tolerance=0.25) == []
+    assert benchmark.compare_to_baseline(report, baseline, tolerance=0.1) == [
+        "GET /todos/ @ 10 todos/user: p95 12.0ms vs baseline 10.0ms"]
+
+def test_benchmark_smoke():
+    try:
+        report = asyncio.run(benchmark.run_benchmark(app, engine, users=2, volumes=[3, 6], requests=4,
+                                                     login_requests=2, concurrency=2))
+    finally:
+        with engine.connect() as connection:
+            connection.execute(text("DELETE FROM todos"))
+            connection.execute(text("DELETE FROM users"))
+            connection.execute(text("DELETE FROM refresh_tokens"))
+            connection.commit()
+
+    assert [run["todos_per_user"] for run in report["runs"]] == [3, 6]
+    for run in report["runs"]:
+        assert set(run["results"]) == {"POST /auth/login", "GET /todos/", "GET /todos/?limit=50", "POST /todos/todo",
+                                       "PUT /todos/todo/{todo_id}", "DELETE /todos/todo/{todo_id}",
+                                       "GET /admin/todo?limit=100"}
+        for result in run["results"].values():
+            assert result["errors"] == 0
+            assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+        assert run["results"]["POST /auth/login"]["requests"] == 2
+        assert run["results"]["DELETE /todos/todo/{todo_id}"]["requests"] == 4
+
+def test_benchmark_refuses_to_wipe_without_confirmation(capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        benchmark.main(["--database-url", "postgresql://bench@localhost/todos"])
+    assert exc_info.value.code == 2
+    assert "--yes-wipe-database" in capsys.readouterr().err
+
+def test_benchmark_skips_updates_when_creates_fail():
+    unavailable = FastAPI()
+
+    @unavailable.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
+    async def down(path: str):
+        return Response(status_code=503)
+
+    results = asyncio.run(benchmark.run_scenarios(unavailable, [1], requests=2, login_requests=1, concurrency=1))
+    assert results["POST /todos/todo"]["errors"] == 2
+    assert "PUT /todos/todo/{todo_id}" not in results
+    assert "DELETE /todos/todo/{todo_id}" not in results
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from datetime import timedelta
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from .utils import *
+from .. import events
+from ..events import EventBroker, todo_event, user_channel, ADMIN_CHANNEL, RESYNC
+from ..routers.auth import get_db, get_current_user, create_access_token
+from ..routers.events import sse_stream
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_current_user] = override_get_current_user
+
+def test_publish_reaches_owner_and_admins_only():
+    async def scenario():
+        broker = EventBroker(None)
+        owner = broker.subscribe(user_channel(1))
+        other = broker.subscribe(user_channel(2))
+        admin = broker.subscribe(ADMIN_CHANNEL)
+        event = todo_event("deleted", {"id": 5, "owner_id": 1})
+        await broker.publish(1, event)
+        return await owner.get(1), await admin.get(1), await other.get(0.01)
+
+    assert asyncio.run(scenario()) == ({"type": "deleted", "todo": {"id": 5, "owner_id": 1}},
+                                       {"type": "deleted", "todo": {"id": 5, "owner_id": 1}},
+                                       None)
+
+def test_slow_subscriber_gets_resync(monkeypatch):
+    monkeypatch.setattr(events, "EVENT_QUEUE_SIZE", 2)
+
+    async def scenario():
+        broker = EventBroker(None)
+        subscription = broker.subscribe(user_channel(1))
+        for todo_id in range(3):
+            await broker.publish(1, todo_event("deleted", {"id": todo_id, "owner_id": 1}))
+        return [await subscription.get(0.01) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [RESYNC, None] # Backlog dropped, then nothing left
+
+def test_unsubscribe_removes_channel():
+    async def scenario():
+        broker = EventBroker(None)
+        subscription = broker.subscribe(user_channel(1))
+        assert broker.subscribers() == 1
+        broker.unsubscribe(subscription)
+        return broker.subscribers(), broker._channels
+
+    assert asyncio.run(scenario()) == (0, {})
+
+def test_sse_stream_formats_events_and_heartbeats(monkeypatch):
+    broker = EventBroker(None)
+    monkeypatch.setattr("routers.events.event_broker", broker)
+
+    async def scenario():
+        subscription = broker.subscribe(user_channel(1))
+        stream = sse_stream(subscription, heartbeat=0.01)
+        chunks = [await anext(stream), await anext(stream)]
+        await broker.publish(1, todo_event("deleted", {"id": 5, "owner_id": 1}))
+        chunks.append(await anext(stream))
+        await stream.aclose()
+        return chunks, broker.subscribers()
+
+    chunks, subscribers = asyncio.run(scenario())
+    assert chunks == [b"retry: 5000\n\n", b": keep-alive\n\n",
+                      b'event: deleted\ndata: {"type":"deleted","todo":{"id":5,"owner_id":1}}\n\n']
+    assert subscribers == 0 # Closing the stream unsubscribes
+
+def test_sse_stream_ends_when_token_expires(monkeypatch):
+    broker = EventBroker(None)
+    monkeypatch.setattr("routers.events.event_broker", broker)
+
+    async def scenario():
+        subscription = broker.subscribe(user_channel(1))
+        chunks = [chunk async for chunk in sse_stream(subscription, heartbeat=0.01, expires_at=time.time() + 0.05)]
+        return chunks, broker.subscribers()
+
+    chunks, subscribers = asyncio.run(scenario())
+    assert chunks[0] == b"retry: 5000\n\n"
+    assert set(chunks[1:]) == {b": keep-alive\n\n"}
+    assert subscribers == 0
+
+def test_sse_requires_token():
+    response = client.get("/events/todos")
+    assert response.status_code == 401
+
+def test_websocket_receives_own_changes():
+    # The REST calls run as the overridden user (id 1); the socket authenticates with a real token for it
+    token = create_access_token("poorvtest", 1, "user", timedelta(minutes=5))
+    with client.websocket_connect(f"/events/todos/ws?access_token={token}") as websocket:
+        response = client.post("/todos/todo", json={"title": "Live todo", "description": "Pushed to the client",
+                                                    "priority": 3, "completed": False})
+        assert response.status_code == 201
+        assert websocket.receive_json() == {"type": "created", "todo": response.json()}
+
+        todo_id = response.json()["id"]
+        assert client.delete(f"/todos/todo/{todo_id}").status_code == 204
+        assert websocket.receive_json() == {"type": "deleted", "todo": {"id": todo_id, "owner_id": 1}}
+
+def test_websocket_rejects_bad_token():
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect("/events/todos/ws?access_token=nope"):
+            pass
+    assert exc.value.code == 1008
+
+def test_websocket_closes_when_token_expires():
+    token = create_access_token("poorvtest", 1, "user", timedelta(seconds=1))
+    with client.websocket_connect(f"/events/todos/ws?access_token={token}") as websocket:
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            while True:
+                websocket.receive_json()
+    assert exc_info.value.code == 1008
@@ -7,4 +7,9 @@ client = TestClient(app)
 def test_return_health_check():
     response = client.get("/healthy")
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() == {"status": "Healthy"}
\ No newline at end of file
+    assert response.json() == {"status": "Healthy"}
+
+def test_database_pool_status():
+    response = client.get("/healthy/db")
+    assert response.status_code == status.HTTP_200_OK
+    assert {"checkouts", "checkins", "wait_seconds_total", "timeouts"} <= response.json().keys()
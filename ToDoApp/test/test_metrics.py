@@ -0,0 +1,62 @@
+from .utils import *
+from fastapi import status
+from .. import metrics
+from ..routers.todos import get_db, get_current_user
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_current_user] = override_get_current_user
+metrics.instrument_engine(async_engine.sync_engine) # The tests' engine, not the app's
+
+def scrape() -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+def test_histogram_render():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe("/a", value=0.05)
+    histogram.observe("/a", value=0.5)
+    histogram.observe("/a", value=5)
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_seconds_bucket{route="/a",le="1.0"} 2',
+        'test_seconds_bucket{route="/a",le="+Inf"} 3',
+        'test_seconds_sum{route="/a"} 5.55',
+        'test_seconds_count{route="/a"} 3',
+    ]
+
+def test_request_metrics_use_route_templates(test_todo):
+    before = scrape()
+    assert client.get("/todos/").status_code == status.HTTP_200_OK
+    assert client.get("/todos/todo/1").status_code == status.HTTP_200_OK
+    assert client.get("/todos/todo/9999").status_code == status.HTTP_404_NOT_FOUND
+    after = scrape()
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta('http_requests_total{method="GET",route="/todos/",status="200"}') == 1
+    assert delta('http_requests_total{method="GET",route="/todos/todo/{todo_id}",status="200"}') == 1
+    assert delta('http_requests_total{method="GET",route="/todos/todo/{todo_id}",status="404"}') == 1
+    assert delta('http_request_duration_seconds_count{method="GET",route="/todos/"}') == 1
+    assert delta('http_request_db_queries_sum{method="GET",route="/todos/"}') >= 2 # version + rows
+    assert delta('http_request_db_seconds_count{method="GET",route="/todos/"}') == 1
+    assert after['http_requests_in_flight{method="GET"}'] == 1 # The scrape itself
+    assert 'db_pool_checkouts_total{pool="async"}' in after
+
+def test_bcrypt_time_per_auth_request(test_user):
+    before = scrape()
+    response = client.post("/auth/token", data={"username": test_user.username, "password": "testpassword"})
+    assert response.status_code == status.HTTP_200_OK
+    after = scrape()
+    assert after['http_request_bcrypt_seconds_count{method="POST",route="/auth/token"}'] \
+        - before.get('http_request_bcrypt_seconds_count{method="POST",route="/auth/token"}', 0) == 1
+    assert after["bcrypt_operations_total"] > before.get("bcrypt_operations_total", 0)
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from ..passwords import PasswordHasher
+
+fast_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4)
+
+@pytest.mark.asyncio
+async def test_hash_and_verify():
+    hasher = PasswordHasher(fast_context, max_workers=2, max_pending=4, retry_after=1)
+    hashed = await hasher.hash("testpassword")
+    assert await hasher.verify("testpassword", hashed) is True
+    assert await hasher.verify("wrongpassword", hashed) is False
+
+@pytest.mark.asyncio
+async def test_verify_and_update_rehashes_on_cost_change():
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("testpassword")
+    hasher = PasswordHasher(fast_context, max_workers=2, max_pending=4, retry_after=1)
+
+    verified, new_hash = await hasher.verify_and_update("testpassword", old_hash)
+    assert verified is True
+    assert new_hash.startswith("$2b$04$")
+
+    verified, new_hash = await hasher.verify_and_update("testpassword", await hasher.hash("testpassword"))
+    assert verified is True
+    assert new_hash is None
+
+@pytest.mark.asyncio
+async def test_queue_full_returns_503():
+    hasher = PasswordHasher(fast_context, max_workers=1, max_pending=1, retry_after=7)
+    first = asyncio.ensure_future(hasher.hash("testpassword"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as excinfo:
+        await hasher.hash("testpassword")
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers == {"Retry-After": "7"}
+    await first
+
+@pytest.mark.asyncio
+async def test_unshed_hash_waits_when_queue_full():
+    hasher = PasswordHasher(fast_context, max_workers=1, max_pending=1, retry_after=7)
+    first = asyncio.ensure_future(hasher.hash("testpassword"))
+    await asyncio.sleep(0)
+
+    hashed = await hasher.hash("importedpassword", shed=False) # Bulk import: queues instead of a 503
+    assert fast_context.verify("importedpassword", hashed)
+    await first
@@ -0,0 +1,91 @@
+import asyncio
+from .utils import *
+from fastapi import status
+from sqlalchemy import select, insert
+from .. import query_audit
+from ..query_audit import QueryAuditor
+from ..routers.admin import get_db, get_current_user
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_current_user] = override_get_current_user
+
+async def run_statements(statements):
+    async with async_engine.connect() as connection:
+        for statement in statements:
+            await connection.execute(statement)
+
+# Query budgets per endpoint: raising one of these should be a deliberate decision
+
+def test_read_all_query_budget(test_user, test_todo, query_log):
+    response = client.get("/todos/")
+    assert response.status_code == status.HTTP_200_OK
+    assert query_log.count == 2 # Owner's list version, then the rows
+    assert query_log.problems() == []
+
+    query_log.reset()
+    response = client.get("/todos/", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert query_log.count == 1 # Version only; no rows loaded
+
+def test_read_todo_query_budget(test_todo, query_log):
+    assert client.get("/todos/todo/1").status_code == status.HTTP_200_OK
+    assert query_log.count == 1
+
+def test_create_todo_query_budget(test_user, test_todo, query_log):
+    request_data = {"title": "Budgeted", "description": "Counted statements", "priority": 2, "completed": False}
+    assert client.post("/todos/todo", json=request_data).status_code == status.HTTP_201_CREATED
+    assert query_log.count == 3 # INSERT, the owner's version bump (UPDATE ... RETURNING), stamping change_seq
+
+def test_admin_read_query_budget(test_todo, query_log):
+    assert client.get("/admin/todo").status_code == status.HTTP_200_OK
+    assert query_log.count == 1
+
+    query_log.reset()
+    assert client.get("/admin/todo/user/1").status_code == status.HTTP_200_OK
+    assert query_log.count == 1 # No separate existence check when the user has todos
+
+    query_log.reset()
+    assert client.get("/admin/todo/user/9999").status_code == status.HTTP_404_NOT_FOUND
+    assert query_log.count == 2
+
+def test_detects_duplicates_and_n_plus_one(test_todo, query_log):
+    asyncio.run(run_statements([select(ToDos.title).filter(ToDos.id == todo_id) for todo_id in (1, 2, 3, 1)]))
+    assert query_log.count == 4
+    assert list(query_log.n_plus_one().values()) == [3]
+    assert list(query_log.duplicates().values()) == [2]
+    assert len(query_log.problems()) == 2
+
+def test_slow_query_logged_with_plan(test_todo, caplog):
+    auditor = QueryAuditor(slow_query_seconds=0) # Everything counts as slow
+    auditor.attach(async_engine.sync_engine)
+    try:
+        with auditor.capture() as log, caplog.at_level("WARNING", logger="query_audit"):
+            asyncio.run(run_statements([select(ToDos.title).filter(ToDos.owner_id == 1)]))
+    finally:
+        auditor.detach(async_engine.sync_engine)
+
+    [query] = log.slow(threshold=0)
+    assert "ix_todos_owner_id" in str(query.plan) # EXPLAIN QUERY PLAN shows the index being used
+    assert "Slow query" in caplog.text
+
+def test_failed_explain_leaves_transaction_usable(test_todo, monkeypatch):
+    monkeypatch.setitem(query_audit.EXPLAIN_PREFIXES, "sqlite", "EXPLAIN NOT A PLAN")
+    auditor = QueryAuditor(slow_query_seconds=0)
+    auditor.attach(async_engine.sync_engine)
+
+    async def scenario():
+        async with async_engine.begin() as connection:
+            await connection.execute(insert(ToDos).values(title="Before", priority=1, owner_id=1))
+            await connection.execute(select(ToDos.title).filter(ToDos.owner_id == 1)) # Its EXPLAIN fails
+            await connection.execute(insert(ToDos).values(title="After", priority=1, owner_id=1))
+
+    try:
+        with auditor.capture() as log:
+            asyncio.run(scenario())
+    finally:
+        auditor.detach(async_engine.sync_engine)
+
+    assert [query.plan for query in log.queries if query.statement.startswith("SELECT")][0].startswith("EXPLAIN failed")
+    db = TestingSessionLocal()
+    assert sorted(todo.title for todo in db.query(ToDos)) == ["After", "Before", "Test ToDo"]
+    db.close()
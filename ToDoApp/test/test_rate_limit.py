@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from fastapi import HTTPException, status
+from .utils import *
+from .. import rate_limit
+from ..routers.auth import get_db
+
+app.dependency_overrides[get_db] = override_get_db
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def fresh_limiter(monkeypatch):
+    backend = rate_limit.InMemoryRateLimitBackend(max_keys=100)
+    monkeypatch.setattr(rate_limit.auth_rate_limiter, "backend", backend)
+    return backend
+
+def test_token_bucket_refills():
+    clock = FakeClock()
+    backend = rate_limit.InMemoryRateLimitBackend(max_keys=10, clock=clock)
+    take = lambda: asyncio.run(backend.take("ip:1", capacity=2, refill_per_second=0.5))
+
+    assert take() == (True, 0.0)
+    assert take() == (True, 0.0)
+    assert take() == (False, 2.0) # One token takes two seconds to come back
+    clock.now += 1
+    assert take() == (False, 1.0)
+    clock.now += 1
+    assert take() == (True, 0.0)
+
+def test_in_memory_backend_is_bounded():
+    backend = rate_limit.InMemoryRateLimitBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        asyncio.run(backend.take(key, capacity=1, refill_per_second=0.01))
+    assert list(backend._buckets) == ["b", "c"]
+
+def test_login_rate_limited_per_username(test_user, fresh_limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit, "AUTH_RATE_LIMIT_USERNAME_BURST", 2)
+    for _ in range(2):
+        response = client.post("/auth/login", json={"username": test_user.username, "password": "wrong"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = client.post("/auth/login", json={"username": test_user.username, "password": "testpassword"})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.json() == {"detail": "Too many requests, try again later."}
+    assert int(response.headers["retry-after"]) >= 1
+
+    # Same client, another account: only the per-username bucket is empty
+    response = client.post("/auth/token", data={"username": "someoneelse", "password": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_auth_rate_limited_per_ip(fresh_limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit, "AUTH_RATE_LIMIT_IP_BURST", 1)
+    # Invalid bodies are rejected before the limiter, so they don't spend tokens
+    assert client.post("/auth/register", json={}).status_code == 422
+    response = client.post("/auth/login", json={"username": "nobody", "password": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post("/auth/login", json={"username": "nobody2", "password": "wrong"})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+def test_auth_concurrency_cap(test_user, fresh_limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit.auth_concurrency, "active", rate_limit.auth_concurrency.limit)
+    response = client.post("/auth/login", json={"username": test_user.username, "password": "testpassword"})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == str(rate_limit.AUTH_RETRY_AFTER)
+    assert client.get("/healthy").status_code == status.HTTP_200_OK # Other routes are unaffected
+
+def test_rate_limited_client_takes_no_admission_slot(test_user, fresh_limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit, "AUTH_RATE_LIMIT_IP_BURST", 1)
+    response = client.post("/auth/login", json={"username": test_user.username, "password": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    # Over its limit: the 429 comes first, even with every slot taken
+    monkeypatch.setattr(rate_limit.auth_concurrency, "active", rate_limit.auth_concurrency.limit)
+    rejected = rate_limit.auth_concurrency.rejected
+    response = client.post("/auth/login", json={"username": test_user.username, "password": "testpassword"})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert rate_limit.auth_concurrency.rejected == rejected # Never reached admission control
+
+def test_concurrency_limiter_releases_slots():
+    limiter = rate_limit.ConcurrencyLimiter(limit=1, retry_after=1)
+
+    async def scenario():
+        async with limiter.slot():
+            with pytest.raises(HTTPException) as exc:
+                async with limiter.slot():
+                    pass
+            assert exc.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        async with limiter.slot():
+            assert limiter.active == 1
+
+    asyncio.run(scenario())
+    assert (limiter.active, limiter.rejected) == (0, 1)
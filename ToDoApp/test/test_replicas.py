@@ -0,0 +1,61 @@
+import asyncio
+import os
+import time
+import pytest
+from fastapi import status
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from .utils import *
+from .. import database
+from ..routers.todos import get_db, get_current_user
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_current_user] = override_get_current_user
+
+REPLICA_FILE = "./replicadb.db"
+
+@pytest.fixture
+def replica(test_todo, monkeypatch):
+    # A second SQLite file stands in for a replica that hasn't caught up with the primary
+    replica_engine = create_engine(f"sqlite:///{REPLICA_FILE}", poolclass=StaticPool)
+    Base.metadata.create_all(bind=replica_engine)
+    with TestingSessionLocal(bind=replica_engine) as db:
+        db.add(ToDos(title="Replica copy", description="Lagging behind the primary", priority=1,
+                     completed=False, owner_id=1))
+        db.commit()
+    replica_async_engine = create_async_engine(f"sqlite+aiosqlite:///{REPLICA_FILE}", poolclass=NullPool)
+    monkeypatch.setattr(database, "ReplicaSessionLocals", [
+        async_sessionmaker(bind=replica_async_engine, expire_on_commit=False, info={"replica": True})])
+    yield
+    client.cookies.clear()
+    asyncio.run(replica_async_engine.dispose())
+    replica_engine.dispose()
+    os.remove(REPLICA_FILE)
+
+def titles(response):
+    return [todo["title"] for todo in response.json()]
+
+def test_reads_go_to_replica(replica):
+    assert titles(client.get("/todos")) == ["Replica copy"]
+    assert client.get("/todos/todo/1").json()["title"] == "Replica copy"
+
+def test_write_pins_reads_to_primary(replica):
+    response = client.post("/todos/todo", json={"title": "Fresh", "description": "Only on the primary",
+                                                "priority": 2, "completed": False})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert "x-last-write" in response.headers
+    assert "last_write" in client.cookies
+
+    assert titles(client.get("/todos")) == ["Test ToDo", "Fresh"] # The cookie keeps this client on the primary
+
+    client.cookies.clear()
+    assert titles(client.get("/todos")) == ["Replica copy"]
+    headers = {"X-Last-Write": response.headers["x-last-write"]}
+    assert titles(client.get("/todos", headers=headers)) == ["Test ToDo", "Fresh"] # Same, for the SPA's header
+    stale = {"X-Last-Write": str(time.time() - 3600)}
+    assert titles(client.get("/todos", headers=stale)) == ["Replica copy"]
+
+def test_failed_write_does_not_pin(replica):
+    response = client.put("/todos/todo/999", json={"title": "Missing", "description": "No such todo",
+                                                   "priority": 2, "completed": False})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert "x-last-write" not in response.headers
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import event
+from .utils import *
+from .. import startup
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous ceilings, tuned to catch regressions (an eager heavy import, per-boot reflection) rather than noise
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3"))
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "1"))
+
+BOOT_SCRIPT = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from sqlalchemy import event
+statements = []
+event.listen(main.async_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+async def boot():
+    async with main.lifespan(main.app):
+        pass
+asyncio.run(boot())
+print(json.dumps({"import": imported - started, "startup": time.perf_counter() - imported, "statements": statements}))
+"""
+
+
+def set_alembic_version(revision):
+    with engine.connect() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        if revision is not None:
+            connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+            connection.execute(text("INSERT INTO alembic_version VALUES (:revision)"), {"revision": revision})
+        connection.commit()
+
+
+@pytest.fixture
+def stamped_db():
+    yield set_alembic_version
+    set_alembic_version(None)
+
+
+def test_check_schema_revision_single_query(stamped_db):
+    head = startup.expected_revision()
+    stamped_db(head)
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        assert asyncio.run(startup.check_schema_revision(async_engine, head)) == head
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    assert statements == ["SELECT version_num FROM alembic_version"]
+
+
+def test_check_schema_revision_mismatch(stamped_db):
+    stamped_db("5093b69c3d10")
+    with pytest.raises(RuntimeError, match="revision 5093b69c3d10"):
+        asyncio.run(startup.check_schema_revision(async_engine, startup.expected_revision()))
+
+    stamped_db(None)
+    with pytest.raises(RuntimeError, match="revision None"):
+        asyncio.run(startup.check_schema_revision(async_engine, startup.expected_revision()))
+
+
+def test_migrated_boot_within_budget(tmp_path):
+    database = tmp_path / "boot.db"
+    head = startup.expected_revision()
+    subprocess.run([sys.executable, "-c",
+                    "import sqlite3, sys; db = sqlite3.connect(sys.argv[1]); "
+                    "db.execute('CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)'); "
+                    "db.execute('INSERT INTO alembic_version VALUES (?)', (sys.argv[2],)); db.commit()",
+                    str(database), head], check=True)
+
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "STARTUP_MODE": "migrated"}
+    result = subprocess.run([sys.executable, "-c", BOOT_SCRIPT], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert timings["statements"] == ["SELECT version_num FROM alembic_version"]
+    assert timings["import"] < IMPORT_BUDGET_SECONDS
+    assert timings["startup"] < STARTUP_BUDGET_SECONDS
@@ -0,0 +1,116 @@
+import pytest
+from .utils import *
+from ..routers.todos import get_db, get_current_user
+from ..todo_cache import (todo_cache, CachedResponse, InMemoryTodoCacheBackend,
+                          RedisTodoCacheBackend, TodoCache)
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_current_user] = override_get_current_user
+
+
+class FakeRedis:
+    # The subset of redis.asyncio used by RedisTodoCacheBackend
+    def __init__(self):
+        self.data = {}
+
+    async def hget(self, name, key):
+        return self.data.get(name, {}).get(key)
+
+    async def hset(self, name, key, value):
+        self.data.setdefault(name, {})[key] = value
+
+    async def hdel(self, name, key):
+        self.data.get(name, {}).pop(key, None)
+
+    async def expire(self, name, seconds):
+        pass
+
+    async def get(self, name):
+        return self.data.get(name)
+
+    async def incr(self, name):
+        self.data[name] = int(self.data.get(name, 0)) + 1
+        return self.data[name]
+
+    async def delete(self, name):
+        self.data.pop(name, None)
+
+    async def scan_iter(self, pattern):
+        for key in list(self.data):
+            if key.startswith(pattern.rstrip("*")):
+                yield key
+
+
+@pytest.fixture
+def memory_cache():
+    backend = todo_cache.backend
+    todo_cache.backend = InMemoryTodoCacheBackend(max_bytes=1024 * 1024)
+    yield todo_cache
+    todo_cache.backend = backend
+
+
+@pytest.mark.asyncio
+async def test_in_memory_backend_is_bounded_by_bytes():
+    backend = InMemoryTodoCacheBackend(max_bytes=400)
+    await backend.set(1, "list:", CachedResponse(b"x" * 100), 0)
+    await backend.set(2, "list:", CachedResponse(b"x" * 100), 0)
+    await backend.get(1, "list:")
+    await backend.set(3, "list:", CachedResponse(b"x" * 100), 0)
+
+    assert await backend.get(2, "list:") is None # least recently used owner evicted
+    assert await backend.get(1, "list:") is not None
+    assert backend.bytes <= 400
+
+
+@pytest.mark.asyncio
+async def test_in_memory_generations_are_bounded():
+    backend = InMemoryTodoCacheBackend(max_bytes=1024, max_generations=2)
+    stale = await backend.generation(1) # A read for owner 1 starts...
+    for owner_id in (1, 2, 3): # ...owner 1 is written, then its counter is pushed out
+        await backend.invalidate(owner_id)
+    assert list(backend._generations) == [2, 3]
+
+    await backend.set(1, "list:", CachedResponse(b"[]"), stale)
+    assert await backend.get(1, "list:") is None # Still recognised as stale
+    await backend.set(1, "list:", CachedResponse(b"[]"), await backend.generation(1))
+    assert await backend.get(1, "list:") is not None
+
+
+@pytest.mark.asyncio
+async def test_stale_read_is_not_cached_after_invalidation():
+    cache = TodoCache(InMemoryTodoCacheBackend(max_bytes=1024))
+    entry, generation = await cache.lookup(1, "list:")
+    assert entry is None
+
+    await cache.invalidate([1]) # a write commits while the read was in flight
+    await cache.store(1, "list:", CachedResponse(b"[]"), generation)
+    assert (await cache.lookup(1, "list:"))[0] is None
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_round_trip_and_invalidate():
+    cache = TodoCache(RedisTodoCacheBackend(FakeRedis(), ttl=60))
+    _, generation = await cache.lookup(1, "list:")
+    await cache.store(1, "list:", CachedResponse(b'[{"id": 1}]', 'W/"abc"'), generation)
+
+    entry, _ = await cache.lookup(1, "list:")
+    assert entry.body == b'[{"id": 1}]'
+    assert entry.etag == 'W/"abc"'
+
+    await cache.invalidate([1])
+    assert (await cache.lookup(1, "list:"))[0] is None
+    assert cache.stats()["hit_ratio"] == 0.3333
+
+
+def test_read_all_served_from_cache_until_write(memory_cache, test_todo):
+    assert client.get("/todos").status_code == 200
+    assert client.get("/todos").json()[0]['title'] == 'Test ToDo'
+    assert memory_cache.hits == 1
+
+    request_data = {"title": "Changed", "description": "Changed todo item", "priority": 2, "completed": False}
+    client.put("/todos/todo/1", json=request_data)
+    assert client.get("/todos").json()[0]['title'] == 'Changed'
+    assert client.get("/todos/todo/1").json()['title'] == 'Changed'
+
+    client.delete("/admin/todo/1")
+    assert client.get("/todos").json() == []
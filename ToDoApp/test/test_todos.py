@@ -1,4 +1,9 @@
+import csv
+import io
+import json
 from ..routers.todos import get_db, get_current_user
+from .. import exports, changes
+from ..pagination import encode_cursor
 from starlette import status
 from ..models import ToDos
 from .utils import *
@@ -34,6 +39,7 @@ def test_create_todo(test_todo):
     }
     response = client.post("/todos/todo/", json=request_data)
     assert response.status_code == 201
+    assert response.json() == {**request_data, 'id': 2, 'owner_id': 1}
 
     db = TestingSessionLocal()
     model = db.query(ToDos).filter(ToDos.id == 2).first()
@@ -50,7 +56,8 @@ def test_update_todo(test_todo):
         "completed": True
     }
     response = client.put("/todos/todo/1", json=request_data)
-    assert response.status_code == 204
+    assert response.status_code == 200
+    assert response.json() == {**request_data, 'id': 1, 'owner_id': 1}
 
     db = TestingSessionLocal()
     model = db.query(ToDos).filter(ToDos.id == 1).first()
@@ -78,4 +85,251 @@ def test_delete_todo(test_todo):
 def test_delete_todo_not_found(test_todo):
     response = client.delete("/todos/todo/999")
     assert response.status_code == 404
-    assert response.json() == {"detail": "ToDo item not found"}
\ No newline at end of file
+    assert response.json() == {"detail": "ToDo item not found"}
+
+def test_update_delete_other_users_todo_not_found(test_todo):
+    db = TestingSessionLocal()
+    db.add(ToDos(title="Foreign", description="Someone else's item", priority=2, completed=False, owner_id=2))
+    db.commit()
+
+    request_data = {"title": "Hijacked", "description": "Should not apply", "priority": 1, "completed": True}
+    assert client.put("/todos/todo/2", json=request_data).status_code == 404
+    assert client.delete("/todos/todo/2").status_code == 404
+
+    db.expire_all()
+    assert db.query(ToDos).filter(ToDos.id == 2).first().title == "Foreign"
+
+def test_read_all_paginated(test_todo):
+    db = TestingSessionLocal()
+    for i in range(2, 6):
+        db.add(ToDos(title=f"ToDo {i}", description="Paged todo item", priority=1, completed=False, owner_id=1))
+    db.commit()
+
+    response = client.get("/todos/?limit=2")
+    assert response.status_code == status.HTTP_200_OK
+    page = response.json()
+    assert [todo['id'] for todo in page['items']] == [1, 2]
+    assert page['next_cursor'] is not None
+
+    response = client.get(f"/todos/?limit=2&cursor={page['next_cursor']}")
+    page = response.json()
+    assert [todo['id'] for todo in page['items']] == [3, 4]
+
+    response = client.get(f"/todos/?limit=2&cursor={page['next_cursor']}")
+    page = response.json()
+    assert [todo['id'] for todo in page['items']] == [5]
+    assert page['next_cursor'] is None
+
+def test_read_all_invalid_cursor(test_todo):
+    response = client.get("/todos/?limit=2&cursor=not-a-cursor")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor."}
+
+def test_read_all_filter_search_and_sort(test_todo):
+    db = TestingSessionLocal()
+    db.add(ToDos(title="Buy milk", description="From the corner shop", priority=3, completed=True, owner_id=1))
+    db.add(ToDos(title="Write report", description="Quarterly 100% numbers", priority=5, completed=False, owner_id=1))
+    db.add(ToDos(title="Other user", description="Not visible here", priority=5, completed=False, owner_id=2))
+    db.commit()
+
+    response = client.get("/todos/?completed=true")
+    assert [todo['title'] for todo in response.json()] == ["Buy milk"]
+
+    response = client.get("/todos/?priority=5")
+    assert [todo['title'] for todo in response.json()] == ["Write report"]
+
+    response = client.get("/todos/?search=MILK")
+    assert [todo['title'] for todo in response.json()] == ["Buy milk"]
+
+    response = client.get("/todos/?search=100%25")
+    assert [todo['title'] for todo in response.json()] == ["Write report"]
+
+    response = client.get("/todos/?sort=-priority")
+    assert [todo['priority'] for todo in response.json()] == [5, 3, 1]
+
+def test_read_all_sorted_pagination(test_todo):
+    db = TestingSessionLocal()
+    for priority in (3, 1, 3, 2):
+        db.add(ToDos(title="Sorted", description="Sorted todo item", priority=priority, completed=False, owner_id=1))
+    db.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/todos/?limit=2&sort=-priority" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).json()
+        seen.extend((todo['priority'], todo['id']) for todo in page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [(3, 4), (3, 2), (2, 5), (1, 3), (1, 1)]
+
+def test_read_all_rejects_mismatched_cursors(test_todo):
+    db = TestingSessionLocal()
+    db.add(ToDos(title="Second", description="Second todo item", priority=2, completed=False, owner_id=1))
+    db.commit()
+
+    cursor = client.get("/todos/?limit=1&sort=-priority").json()['next_cursor']
+    response = client.get(f"/todos/?limit=1&sort=title&cursor={cursor}")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Cursor does not match the requested sort."}
+
+    for values in ({"sort": "-priority", "id": 1, "key": "2"}, {"sort": "-priority", "id": 1, "key": True},
+                   {"sort": "-priority", "id": True, "key": 2}, {"sort": "-priority", "id": 1, "key": [2]},
+                   {"sort": "-priority", "id": 2 ** 70, "key": 2}, {"sort": "-priority", "id": 1}):
+        response = client.get(f"/todos/?limit=1&sort=-priority&cursor={encode_cursor(values)}")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_batch_operations(test_todo):
+    db = TestingSessionLocal()
+    db.add(ToDos(title="Second", description="Second todo item", priority=2, completed=False, owner_id=1))
+    db.add(ToDos(title="Third", description="Third todo item", priority=2, completed=False, owner_id=1))
+    db.add(ToDos(title="Foreign", description="Someone else's item", priority=2, completed=False, owner_id=2))
+    db.commit()
+
+    response = client.post("/todos/batch", json={"operations": [
+        {"op": "create", "todo": {"title": "Batch new", "description": "Created in batch", "priority": 4, "completed": False}},
+        {"op": "update", "id": 1, "todo": {"title": "Batch updated", "description": "Updated in batch", "priority": 5, "completed": False}},
+        {"op": "complete", "id": 2},
+        {"op": "delete", "id": 3},
+        {"op": "delete", "id": 4},
+        {"op": "complete", "id": 1},
+    ]})
+    assert response.status_code == status.HTTP_200_OK
+    assert [result['status'] for result in response.json()['results']] == [201, 200, 200, 204, 404, 409]
+    assert response.json()['results'][0]['id'] == 5
+
+    db.expire_all()
+    assert db.query(ToDos).filter(ToDos.id == 5).first().title == "Batch new"
+    assert db.query(ToDos).filter(ToDos.id == 1).first().title == "Batch updated"
+    assert db.query(ToDos).filter(ToDos.id == 2).first().completed is True
+    assert db.query(ToDos).filter(ToDos.id == 3).first() is None
+    assert db.query(ToDos).filter(ToDos.id == 4).first() is not None
+
+def test_batch_operations_validation(test_todo):
+    response = client.post("/todos/batch", json={"operations": [{"op": "update", "id": 1}]})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    operations = [{"op": "complete", "id": 1}] * 501
+    response = client.post("/todos/batch", json={"operations": operations})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+def test_read_all_conditional_get(test_user, test_todo):
+    response = client.get("/todos")
+    assert response.status_code == status.HTTP_200_OK
+    etag = response.headers['etag']
+
+    response = client.get("/todos", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    # Different query parameters are a different representation
+    response = client.get("/todos?limit=1", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+
+    request_data = {"title": "Changed", "description": "Changed todo item", "priority": 2, "completed": False}
+    client.put("/todos/todo/1", json=request_data)
+    response = client.get("/todos", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['etag'] != etag
+
+def test_export_todos_streams_in_batches(test_todo, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+    db = TestingSessionLocal()
+    for i in range(2, 6):
+        db.add(ToDos(title=f"ToDo {i}", description="Exported todo item", priority=2, completed=False, owner_id=1))
+    db.add(ToDos(title="Foreign", description="Someone else's", priority=1, completed=False, owner_id=2))
+    db.commit()
+
+    response = client.get("/todos/export")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="todos.ndjson"'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [todo["id"] for todo in lines] == [1, 2, 3, 4, 5]
+    assert lines[0] == {'completed': False, 'description': 'This is a test todo item',
+                        'id': 1, 'owner_id': 1, 'priority': 1, 'title': 'Test ToDo'}
+
+    response = client.get("/todos/export?format=csv&priority=2&sort=-id")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "title", "description", "priority", "completed", "owner_id"]
+    assert [row[0] for row in rows[1:]] == ["5", "4", "3", "2"]
+
+def test_export_todos_empty(test_user):
+    response = client.get("/todos/export?format=csv")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text.splitlines() == ["id,title,description,priority,completed,owner_id"]
+
+def test_search_todos_ranked_and_paginated(test_todo):
+    db = TestingSessionLocal()
+    db.add(ToDos(title="Grocery run", description="Buy milk and bread", priority=2, completed=False, owner_id=1))
+    db.add(ToDos(title="Milk the budget", description="Milk milk milk", priority=2, completed=False, owner_id=1))
+    db.add(ToDos(title="Milk", description="Someone else's milk", priority=1, completed=False, owner_id=2))
+    db.commit()
+
+    response = client.get("/todos/search?q=milk")
+    assert response.status_code == status.HTTP_200_OK
+    items = response.json()["items"]
+    assert [todo["title"] for todo in items] == ["Milk the budget", "Grocery run"] # Best match first, own todos only
+    assert items[0]["rank"] <= items[1]["rank"]
+
+    first = client.get("/todos/search?q=milk&limit=1").json()
+    second = client.get(f"/todos/search?q=milk&limit=1&cursor={first['next_cursor']}").json()
+    assert [todo["title"] for todo in first["items"] + second["items"]] == ["Milk the budget", "Grocery run"]
+    assert second["next_cursor"] is None
+
+    # Prefix match, every term required
+    assert [todo["title"] for todo in client.get("/todos/search?q=gro bre").json()["items"]] == ["Grocery run"]
+
+def test_search_index_follows_writes(test_todo):
+    request_data = {"title": "Renamed", "description": "Quarterly report draft", "priority": 2, "completed": False}
+    assert client.get("/todos/search?q=quarterly").json()["items"] == []
+    client.put("/todos/todo/1", json=request_data)
+    assert [todo["id"] for todo in client.get("/todos/search?q=quarterly").json()["items"]] == [1]
+    client.delete("/todos/todo/1")
+    assert client.get("/todos/search?q=quarterly").json()["items"] == []
+
+def test_search_todos_rejects_query_without_terms(test_todo):
+    response = client.get('/todos/search?q="*"')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_changes_since_token(test_user, test_todo):
+    payload = {"title": "Synced todo", "description": "Tracked by the change feed", "priority": 2, "completed": False}
+    snapshot = client.get("/todos/changes")
+    assert snapshot.status_code == status.HTTP_200_OK
+    token = snapshot.json()["next_since"]
+
+    first = client.post("/todos/todo", json=payload).json()
+    second = client.post("/todos/todo", json=payload).json()
+    response = client.get(f"/todos/changes?since={token}").json()
+    # The fixture's row was inserted behind the API's back; the owner's next write stamps it too
+    assert [todo["id"] for todo in response["changes"]] == [test_todo.id, first["id"], second["id"]]
+    assert response["deleted"] == []
+    token = response["next_since"]
+
+    # Nothing new: an empty delta, same token
+    assert client.get(f"/todos/changes?since={token}").json() == {"changes": [], "deleted": [], "next_since": token}
+
+    client.put(f"/todos/todo/{first['id']}", json={**payload, "completed": True})
+    client.delete(f"/todos/todo/{second['id']}")
+    response = client.get(f"/todos/changes?since={token}").json()
+    assert [(todo["id"], todo["completed"]) for todo in response["changes"]] == [(first["id"], True)]
+    assert response["deleted"] == [second["id"]]
+
+    # A full snapshot has the surviving todos and no tombstones
+    response = client.get("/todos/changes").json()
+    assert [todo["id"] for todo in response["changes"]] == [test_todo.id, first["id"]]
+    assert response["deleted"] == []
+
+def test_changes_expired_token(test_user, test_todo, monkeypatch):
+    payload = {"title": "Synced todo", "description": "Tracked by the change feed", "priority": 2, "completed": False}
+    client.post("/todos/todo", json=payload)
+    token = client.get("/todos/changes").json()["next_since"]
+    for _ in range(3):
+        client.post("/todos/todo", json=payload)
+
+    monkeypatch.setattr(changes, "TODO_CHANGES_LIMIT", 2)
+    assert client.get(f"/todos/changes?since={token}").status_code == status.HTTP_410_GONE # Cheaper to refetch
+    assert client.get("/todos/changes?since=999999").status_code == status.HTTP_410_GONE
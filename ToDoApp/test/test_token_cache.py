@@ -0,0 +1,58 @@
+import pytest
+from ..token_cache import TokenCache, InMemoryTokenCacheBackend
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+principal = {'username': 'poorvtest', 'id': 1, 'user_role': 'admin'}
+
+@pytest.mark.asyncio
+async def test_cache_hit_and_miss_counters():
+    clock = FakeClock()
+    cache = TokenCache(max_entries=10, clock=clock)
+
+    assert await cache.get("token-a") is None
+    await cache.set("token-a", principal, clock.now + 60)
+    assert await cache.get("token-a") == principal
+    assert cache.stats() == {"size": 1, "max_entries": 10, "hits": 1, "misses": 1}
+
+@pytest.mark.asyncio
+async def test_cache_entry_expires_with_token():
+    clock = FakeClock()
+    cache = TokenCache(max_entries=10, clock=clock)
+    await cache.set("token-a", principal, clock.now + 60)
+
+    clock.now += 61
+    assert await cache.get("token-a") is None
+    assert cache.stats()["size"] == 0
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used():
+    clock = FakeClock()
+    cache = TokenCache(max_entries=2, clock=clock)
+    await cache.set("token-a", principal, clock.now + 60)
+    await cache.set("token-b", principal, clock.now + 60)
+    await cache.get("token-a")
+    await cache.set("token-c", principal, clock.now + 60)
+
+    assert await cache.get("token-b") is None
+    assert await cache.get("token-a") == principal
+    assert await cache.get("token-c") == principal
+
+@pytest.mark.asyncio
+async def test_shared_backend_is_used_across_workers():
+    clock = FakeClock()
+    shared = InMemoryTokenCacheBackend(clock=clock)
+    worker_one = TokenCache(max_entries=10, shared=shared, clock=clock)
+    worker_two = TokenCache(max_entries=10, shared=shared, clock=clock)
+
+    await worker_one.set("token-a", principal, clock.now + 60)
+    assert await worker_two.get("token-a") == principal
+    assert worker_two.hits == 1
+
+    clock.now += 61
+    assert await worker_two.get("token-a") is None
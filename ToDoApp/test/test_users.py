@@ -41,3 +41,21 @@ def test_change_phone_number_success(test_user):
         "/user/phonenumber/222222"
     )
     assert response.status_code == status.HTTP_204_NO_CONTENT
+
+def test_return_user_hides_password_hash(test_user):
+    response = client.get("/user")
+    assert response.status_code == status.HTTP_200_OK
+    assert 'hashed_password' not in response.json()
+
+def test_return_user_conditional_get(test_user):
+    response = client.get("/user")
+    etag = response.headers['etag']
+    assert 'last-modified' in response.headers
+
+    response = client.get("/user", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.put("/user/phonenumber/333333")
+    response = client.get("/user", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['phone_number'] == '333333'
@@ -1,5 +1,6 @@
 from sqlalchemy import create_engine, text
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool, NullPool
 from ..database import Base
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
@@ -7,6 +8,7 @@ import pytest
 from ..main import app
 from ..models import ToDos, Users
 from ..routers.auth import bcrypt_context
+from ..query_audit import query_auditor
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./testdb.db"
 
@@ -18,20 +20,37 @@ engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The routers use AsyncSession; NullPool because TestClient may run each request on a fresh event loop
+async_engine = create_async_engine("sqlite+aiosqlite:///./testdb.db", poolclass=NullPool)
+
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base.metadata.create_all(bind=engine)
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
+query_auditor.attach(async_engine.sync_engine) # Only the app's queries; fixtures write through the sync engine
+
+async def override_get_db():
+    async with TestingAsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 def override_get_current_user():
     return {'username': 'poorvtest', 'id': 1, 'user_role': 'admin'}
 
 client = TestClient(app)
 
+@pytest.fixture(autouse=True)
+def reset_todo_ids():
+    # todos uses AUTOINCREMENT; tests expect a cleared table to hand out id 1 again
+    with engine.connect() as connection:
+        connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'todos'"))
+        connection.commit()
+
+@pytest.fixture
+def query_log():
+    # Statements the app runs during the test, e.g. `assert query_log.count == 1`
+    with query_auditor.capture() as log:
+        yield log
+
 @pytest.fixture
 def test_todo():
     todo = ToDos(
@@ -65,5 +84,6 @@ def test_user():
     db.commit()
     yield user
     with engine.connect() as connection:
+        connection.execute(text("DELETE FROM todo_tombstones;")) # Ids are reused, so a new user must not inherit them
         connection.execute(text("DELETE FROM users;"))
         connection.commit()
\ No newline at end of file
@@ -0,0 +1,217 @@
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from fastapi import Request, Response
+from versioning import not_modified, validator_headers
+
+TODO_CACHE_BACKEND = os.getenv("TODO_CACHE_BACKEND", "none") # none | memory | redis
+TODO_CACHE_MAX_BYTES = int(os.getenv("TODO_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TODO_CACHE_REDIS_URL = os.getenv("TODO_CACHE_REDIS_URL", "redis://localhost:6379/0")
+TODO_CACHE_TTL = int(os.getenv("TODO_CACHE_TTL", "3600"))
+TODO_CACHE_MAX_GENERATIONS = int(os.getenv("TODO_CACHE_MAX_GENERATIONS", "100000")) # Owners with their own counter
+
+
+class CachedResponse:
+    # A rendered JSON body plus the validators it was served with
+
+    def __init__(self, body: bytes, etag: str | None = None, last_modified: datetime | None = None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def to_response(self, request: Request) -> Response:
+        if self.etag is None:
+            return Response(self.body, media_type="application/json")
+        cached = not_modified(request, self.etag, self.last_modified)
+        if cached is not None:
+            return cached
+        return Response(self.body, media_type="application/json",
+                        headers=validator_headers(self.etag, self.last_modified))
+
+    def to_bytes(self) -> bytes:
+        last_modified = self.last_modified.isoformat() if self.last_modified else ""
+        return f"{self.etag or ''}\n{last_modified}\n".encode() + self.body
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "CachedResponse":
+        etag, last_modified, body = raw.split(b"\n", 2)
+        return cls(body, etag.decode() or None,
+                   datetime.fromisoformat(last_modified.decode()) if last_modified else None)
+
+    def __len__(self) -> int:
+        return len(self.body) + len(self.etag or "") + 64
+
+
+class TodoCacheBackend(ABC):
+    # Entries are grouped per owner so a write can drop everything cached for that owner at once.
+    # The generation counter stops a read that started before an invalidation from re-caching stale data.
+
+    @abstractmethod
+    async def get(self, owner_id: int, key: str) -> CachedResponse | None:
+        ...
+
+    @abstractmethod
+    async def generation(self, owner_id: int) -> int:
+        ...
+
+    @abstractmethod
+    async def set(self, owner_id: int, key: str, entry: CachedResponse, generation: int) -> None:
+        ...
+
+    @abstractmethod
+    async def invalidate(self, owner_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InMemoryTodoCacheBackend(TodoCacheBackend):
+    # Process-local LRU over owners, bounded by the total size of cached bodies.
+    # Only correct with a single worker: other workers never see this process's invalidations.
+
+    def __init__(self, max_bytes: int, max_generations: int = TODO_CACHE_MAX_GENERATIONS):
+        self.max_bytes = max_bytes
+        self.max_generations = max_generations
+        self.bytes = 0
+        self._owners = OrderedDict() # owner_id -> {key: CachedResponse}
+        # Generations come from one increasing sequence, so the counters are an LRU too: an owner
+        # whose counter was dropped falls back to _floor, the newest value dropped, which is still
+        # above any generation a read could have taken before that owner's last invalidation
+        self._generations = OrderedDict()
+        self._sequence = 0
+        self._floor = 0
+
+    async def get(self, owner_id: int, key: str) -> CachedResponse | None:
+        entries = self._owners.get(owner_id)
+        if entries is None or key not in entries:
+            return None
+        self._owners.move_to_end(owner_id)
+        return entries[key]
+
+    async def generation(self, owner_id: int) -> int:
+        return self._generations.get(owner_id, self._floor)
+
+    async def set(self, owner_id: int, key: str, entry: CachedResponse, generation: int) -> None:
+        if generation != self._generations.get(owner_id, self._floor) or len(entry) > self.max_bytes:
+            return
+        entries = self._owners.setdefault(owner_id, {})
+        if key in entries:
+            self.bytes -= len(entries[key])
+        entries[key] = entry
+        self.bytes += len(entry)
+        self._owners.move_to_end(owner_id)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._owners.popitem(last=False) # Evict the least recently used owner
+            self.bytes -= sum(len(cached) for cached in evicted.values())
+
+    async def invalidate(self, owner_id: int) -> None:
+        self._sequence += 1
+        self._generations[owner_id] = self._sequence
+        self._generations.move_to_end(owner_id)
+        while len(self._generations) > self.max_generations:
+            _, self._floor = self._generations.popitem(last=False) # Oldest, so the smallest value
+        entries = self._owners.pop(owner_id, None)
+        if entries:
+            self.bytes -= sum(len(cached) for cached in entries.values())
+
+    async def clear(self) -> None:
+        for owner_id in list(self._owners):
+            await self.invalidate(owner_id)
+
+    def stats(self) -> dict:
+        return {"owners": len(self._owners), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+class RedisTodoCacheBackend(TodoCacheBackend):
+    # Shared between workers. Works with any redis.asyncio-compatible client;
+    # memory is bounded by the server's maxmemory policy plus a per-owner TTL.
+
+    def __init__(self, client, ttl: int, prefix: str = "todos"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, owner_id: int) -> str:
+        return f"{self.prefix}:{owner_id}"
+
+    async def get(self, owner_id: int, key: str) -> CachedResponse | None:
+        raw = await self.client.hget(self._key(owner_id), key)
+        return CachedResponse.from_bytes(raw) if raw is not None else None
+
+    async def generation(self, owner_id: int) -> int:
+        return int(await self.client.get(f"{self._key(owner_id)}:gen") or 0)
+
+    async def set(self, owner_id: int, key: str, entry: CachedResponse, generation: int) -> None:
+        if await self.generation(owner_id) != generation:
+            return
+        await self.client.hset(self._key(owner_id), key, entry.to_bytes())
+        await self.client.expire(self._key(owner_id), self.ttl)
+        if await self.generation(owner_id) != generation:
+            # An invalidation raced with this write; drop what we just stored
+            await self.client.hdel(self._key(owner_id), key)
+
+    async def invalidate(self, owner_id: int) -> None:
+        await self.client.incr(f"{self._key(owner_id)}:gen")
+        await self.client.delete(self._key(owner_id))
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(f"{self.prefix}:*"):
+            name = key.decode() if isinstance(key, bytes) else key
+            if not name.endswith(":gen"):
+                await self.client.delete(key)
+
+
+class TodoCache:
+    # Read-through cache for per-owner todo responses; backend=None disables it
+
+    def __init__(self, backend: TodoCacheBackend | None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def lookup(self, owner_id: int, key: str) -> tuple[CachedResponse | None, int]:
+        if self.backend is None:
+            return None, 0
+        entry = await self.backend.get(owner_id, key)
+        if entry is not None:
+            self.hits += 1
+            return entry, 0
+        self.misses += 1
+        return None, await self.backend.generation(owner_id)
+
+    async def store(self, owner_id: int, key: str, entry: CachedResponse, generation: int) -> None:
+        if self.backend is not None:
+            await self.backend.set(owner_id, key, entry, generation)
+
+    async def invalidate(self, owner_ids) -> None:
+        if self.backend is not None:
+            for owner_id in {owner_id for owner_id in owner_ids if owner_id is not None}:
+                await self.backend.invalidate(owner_id)
+
+    async def clear(self) -> None:
+        if self.backend is not None:
+            await self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"enabled": self.backend is not None, "hits": self.hits, "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                **(self.backend.stats() if self.backend is not None else {})}
+
+
+def build_todo_cache() -> TodoCache:
+    if TODO_CACHE_BACKEND == "memory":
+        return TodoCache(InMemoryTodoCacheBackend(TODO_CACHE_MAX_BYTES))
+    if TODO_CACHE_BACKEND == "redis":
+        import redis.asyncio # Optional dependency, only needed for the shared backend
+        return TodoCache(RedisTodoCacheBackend(redis.asyncio.from_url(TODO_CACHE_REDIS_URL), TODO_CACHE_TTL))
+    return TodoCache(None)
+
+
+todo_cache = build_todo_cache()
@@ -0,0 +1,27 @@
+from stats import materialized, apply_todo_stats
+from todo_cache import todo_cache
+from versioning import bump_todos_version
+from events import event_broker
+from changes import stamp_changes
+
+# Every path that writes todos reports the affected owners here, so per-owner
+# bookkeeping lives in one place instead of being repeated in each handler.
+
+
+async def todos_changed(db, owner_ids, deleted=(), stats=None) -> None:
+    # Inside the writer's transaction, before commit. deleted: (todo_id, owner_id) pairs, for tombstones;
+    # stats: the write's counter changes, from stats.stats_delta
+    await db.flush() # Sessions don't autoflush; pending ORM inserts must be stamped too
+    owner_ids = {owner_id for owner_id in owner_ids if owner_id is not None}
+    versions = await bump_todos_version(db, owner_ids)
+    await stamp_changes(db, versions, deleted)
+    if materialized() and stats:
+        await apply_todo_stats(db, stats)
+
+
+async def todos_committed(owner_ids, events=()) -> None:
+    # After commit: only now is it safe to drop cached reads and tell subscribers.
+    # events: (owner_id, event) pairs built with events.todo_event
+    await todo_cache.invalidate(owner_ids)
+    for owner_id, event in events:
+        await event_broker.publish(owner_id, event)
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+
+def token_digest(token: str) -> str:
+    # Never keep raw bearer tokens as cache keys
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenCacheBackend(ABC):
+    # Interface for a cache shared between workers (e.g. Redis); values expire after ttl seconds
+
+    @abstractmethod
+    async def get(self, key: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, principal: dict, ttl: float) -> None:
+        ...
+
+
+class InMemoryTokenCacheBackend(TokenCacheBackend):
+    # Process-local stand-in for a shared backend
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._entries = {}
+
+    async def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        principal, expires_at = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        return principal
+
+    async def set(self, key: str, principal: dict, ttl: float) -> None:
+        self._entries[key] = (principal, self._clock() + ttl)
+
+
+class TokenCache:
+    # LRU of verified token principals, each kept until its token's exp claim
+
+    def __init__(self, max_entries: int, shared: TokenCacheBackend | None = None, clock=time.time):
+        self.max_entries = max_entries
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+
+    async def get(self, token: str) -> dict | None:
+        key = token_digest(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            principal, expires_at = entry
+            if expires_at > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(principal)
+            del self._entries[key]
+
+        if self.shared is not None:
+            principal = await self.shared.get(key)
+            if principal is not None:
+                self._store(key, principal, principal["exp"])
+                self.hits += 1
+                return self._public(principal)
+
+        self.misses += 1
+        return None
+
+    async def set(self, token: str, principal: dict, expires_at: float) -> None:
+        ttl = expires_at - self._clock()
+        if ttl <= 0:
+            return
+        key = token_digest(token)
+        self._store(key, principal, expires_at)
+        if self.shared is not None:
+            await self.shared.set(key, {**principal, "exp": expires_at}, ttl)
+
+    def _store(self, key: str, principal: dict, expires_at: float) -> None:
+        self._entries[key] = (self._public(principal), expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False) # Evict least recently used
+
+    @staticmethod
+    def _public(principal: dict) -> dict:
+        return {k: v for k, v in principal.items() if k != "exp"}
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(TOKEN_CACHE_MAX_ENTRIES)
@@ -0,0 +1,67 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from sqlalchemy import update
+from starlette import status
+from models import Users, utcnow
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything we store is UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def bump_todos_version(db, owner_ids) -> dict:
+    # Every todo write bumps its owner's list version, which is what the list ETag is built from.
+    # Returns {owner_id: new version}; the row lock it takes orders concurrent writers per owner.
+    owner_ids = {owner_id for owner_id in owner_ids if owner_id is not None}
+    if not owner_ids:
+        return {}
+    rows = await db.execute(update(Users).filter(Users.id.in_(owner_ids))
+                            .values(todos_version=Users.todos_version + 1, todos_updated_at=utcnow())
+                            .returning(Users.id, Users.todos_version))
+    return {row.id: row.todos_version for row in rows}
+
+
+def touch_user(user_model: Users) -> None:
+    # SQL-side increment so concurrent profile writes never share a version
+    user_model.version = Users.version + 1
+    user_model.updated_at = utcnow()
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def validator_headers(etag: str, last_modified: datetime | None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"} # Always revalidate, but allow 304s
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def _is_fresh(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison; If-Modified-Since is ignored when If-None-Match is present
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return _as_utc(last_modified).replace(microsecond=0) <= since
+
+
+def not_modified(request: Request, etag: str, last_modified: datetime | None) -> Response | None:
+    if _is_fresh(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag, last_modified))
+    return None
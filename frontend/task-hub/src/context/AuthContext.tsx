@@ -1,7 +1,7 @@
 import React, { createContext, useContext, useState, ReactNode } from "react";
 import { User } from "@/types";
 import { useEffect } from "react";
-import api from "@/lib/api";
+import api, { clearTokens, storeTokens } from "@/lib/api";
 
 interface AuthContextType {
   user: User | null;
@@ -30,9 +30,7 @@ export const AuthProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
         password,
       });
 
-      const token = res.data.access_token;
-
-      localStorage.setItem("token", token);
+      storeTokens(res.data.access_token, res.data.refresh_token);
 
       const userRes = await api.get("/user");
 
@@ -55,7 +53,7 @@ export const AuthProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
         const res = await api.get("/user");
         setUser(res.data);
       } catch (err) {
-        localStorage.removeItem("token");
+        clearTokens();
         setUser(null);
       } finally {
         setLoading(false);
@@ -71,7 +69,12 @@ export const AuthProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
   };
 
   const logout = () => {
-    localStorage.removeItem("token");
+    const refreshToken = localStorage.getItem("refreshToken");
+    if (refreshToken) {
+      // Revoke the session server-side; local sign-out doesn't wait for it
+      api.post("/auth/logout", { refresh_token: refreshToken }).catch(() => {});
+    }
+    clearTokens();
     setUser(null);
   };
 
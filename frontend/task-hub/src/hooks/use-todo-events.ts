@@ -0,0 +1,69 @@
+import { useEffect, useRef, useState } from "react";
+import { Todo } from "@/types";
+import { refreshSession, TOKEN_CHANGE_EVENT } from "@/lib/api";
+
+export type TodoEvent =
+  | { type: "created" | "updated"; todo: Todo }
+  | { type: "deleted"; todo: Pick<Todo, "id" | "owner_id"> }
+  | { type: "resync" };
+
+// Applies a pushed change to a list of todos. Upserts, so the response to our
+// own request and the event for it don't produce duplicates.
+export const applyTodoEvent = (todos: Todo[], event: TodoEvent): Todo[] => {
+  if (event.type === "deleted") {
+    return todos.filter((todo) => todo.id !== event.todo.id);
+  }
+  if (event.type === "created" || event.type === "updated") {
+    const incoming = event.todo;
+    return todos.some((todo) => todo.id === incoming.id)
+      ? todos.map((todo) => (todo.id === incoming.id ? incoming : todo))
+      : [...todos, incoming];
+  }
+  return todos;
+};
+
+// Subscribes to /events/todos while `enabled`. EventSource can't send headers,
+// so the access token goes in the query string. It reconnects on its own after
+// network errors; the server ends the stream when the token expires, and the
+// rejected reconnect refreshes the token, which opens a new stream.
+export function useTodoEvents(onEvent: (event: TodoEvent) => void, enabled = true) {
+  const handler = useRef(onEvent);
+  handler.current = onEvent;
+  const [token, setToken] = useState(() => localStorage.getItem("token"));
+  const connected = useRef(false);
+
+  useEffect(() => {
+    const sync = () => setToken(localStorage.getItem("token"));
+    window.addEventListener(TOKEN_CHANGE_EVENT, sync);
+    window.addEventListener("storage", sync); // Tokens renewed in another tab
+    return () => {
+      window.removeEventListener(TOKEN_CHANGE_EVENT, sync);
+      window.removeEventListener("storage", sync);
+    };
+  }, []);
+
+  useEffect(() => {
+    if (!enabled || !token) return;
+
+    const base = import.meta.env.VITE_API_BASE_URL ?? "";
+    const source = new EventSource(`${base}/events/todos?access_token=${encodeURIComponent(token)}`);
+    const listener = (message: MessageEvent) => handler.current(JSON.parse(message.data));
+    for (const type of ["created", "updated", "deleted", "resync"]) {
+      source.addEventListener(type, listener);
+    }
+    // A reconnect (or a new stream after a token refresh) may have missed events;
+    // the very first open follows a fresh fetch anyway
+    source.onopen = () => {
+      if (connected.current) handler.current({ type: "resync" });
+      connected.current = true;
+    };
+    source.onerror = () => {
+      // CLOSED means the server refused the reconnect (expired token), not a network blip
+      if (source.readyState === EventSource.CLOSED) {
+        source.close();
+        refreshSession();
+      }
+    };
+    return () => source.close();
+  }, [enabled, token]);
+}
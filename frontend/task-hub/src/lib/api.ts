@@ -1,15 +1,88 @@
-import axios from "axios";
+import axios, { AxiosError, InternalAxiosRequestConfig } from "axios";
 
 const api = axios.create({
   baseURL: import.meta.env.VITE_API_BASE_URL,
 });
 
+// Set by the API after a write; echoing it back keeps our reads on the primary
+// database until replicas have caught up, so we always see our own changes.
+const LAST_WRITE_HEADER = "X-Last-Write";
+
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem("token");
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
   }
+  const lastWrite = sessionStorage.getItem("lastWrite");
+  if (lastWrite) {
+    config.headers[LAST_WRITE_HEADER] = lastWrite;
+  }
   return config;
 });
 
+// Fired on window whenever the access token changes, so long-lived connections
+// (the todo event stream) can reconnect with the new one.
+export const TOKEN_CHANGE_EVENT = "tokenchange";
+
+export const storeTokens = (accessToken: string, refreshToken?: string | null) => {
+  localStorage.setItem("token", accessToken);
+  if (refreshToken) {
+    localStorage.setItem("refreshToken", refreshToken);
+  }
+  window.dispatchEvent(new Event(TOKEN_CHANGE_EVENT));
+};
+
+export const clearTokens = () => {
+  localStorage.removeItem("token");
+  localStorage.removeItem("refreshToken");
+  window.dispatchEvent(new Event(TOKEN_CHANGE_EVENT));
+};
+
+// One refresh at a time: concurrent 401s wait for the same renewal instead of
+// each spending (and rotating) the refresh token.
+let pendingRefresh: Promise<string | null> | null = null;
+
+const refreshAccessToken = async (): Promise<string | null> => {
+  const refreshToken = localStorage.getItem("refreshToken");
+  if (!refreshToken) return null;
+  try {
+    const res = await axios.post(`${import.meta.env.VITE_API_BASE_URL ?? ""}/auth/refresh`, {
+      refresh_token: refreshToken,
+    });
+    storeTokens(res.data.access_token, res.data.refresh_token);
+    return res.data.access_token;
+  } catch {
+    clearTokens();
+    return null;
+  }
+};
+
+export const refreshSession = (): Promise<string | null> => {
+  pendingRefresh ??= refreshAccessToken().finally(() => {
+    pendingRefresh = null;
+  });
+  return pendingRefresh;
+};
+
+api.interceptors.response.use(
+  (response) => {
+    const lastWrite = response.headers[LAST_WRITE_HEADER.toLowerCase()];
+    if (lastWrite) {
+      sessionStorage.setItem("lastWrite", lastWrite);
+    }
+    return response;
+  },
+  async (error: AxiosError) => {
+    const config = error.config as (InternalAxiosRequestConfig & { _retried?: boolean }) | undefined;
+    if (error.response?.status !== 401 || !config || config._retried || config.url?.startsWith("/auth/")) {
+      throw error;
+    }
+    const token = await refreshSession();
+    if (!token) throw error;
+    config._retried = true;
+    config.headers.Authorization = `Bearer ${token}`;
+    return api(config);
+  }
+);
+
 export default api;
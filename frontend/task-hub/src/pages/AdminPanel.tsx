@@ -15,6 +15,7 @@ import {
 import { Search, Filter, Users, ListTodo, Shield } from "lucide-react";
 import { Navigate } from "react-router-dom";
 import { useEffect } from "react";
+import { applyTodoEvent, useTodoEvents } from "@/hooks/use-todo-events";
 import api from "@/lib/api";
 
 const AdminPanel = () => {
@@ -26,11 +27,15 @@ const AdminPanel = () => {
   const [filterStatus, setFilterStatus] = useState<"all" | "completed" | "pending">("all");
   const [selectedUserId, setSelectedUserId] = useState<string>("all");
 
-  if (loading) return null;
+  const [reloadKey, setReloadKey] = useState(0);
 
-  if (!isAdmin) {
-    return <Navigate to="/" replace />;
-  }
+  useTodoEvents((event) => {
+    if (event.type === "resync") {
+      setReloadKey((key) => key + 1);
+    } else if (selectedUserId === "all" || String(event.todo.owner_id) === selectedUserId) {
+      setTodos((prev) => applyTodoEvent(prev, event));
+    }
+  }, isAdmin);
 
   useEffect(() => {
     if (!isAdmin) return;
@@ -50,7 +55,7 @@ const AdminPanel = () => {
     };
 
     fetchAdminTodos();
-  }, [isAdmin, selectedUserId]);
+  }, [isAdmin, selectedUserId, reloadKey]);
 
   useEffect(() => {
     if (!isAdmin) return;
@@ -105,6 +110,12 @@ const AdminPanel = () => {
     };
   }, [todos, totalUsers]);
 
+  if (loading) return null;
+
+  if (!isAdmin) {
+    return <Navigate to="/" replace />;
+  }
+
   const handleToggleComplete = () => { };
 
   const handleEdit = (todo: Todo) => {
@@ -3,6 +3,7 @@ import { useAuth } from "@/context/AuthContext";
 import { Todo, TodoFormData } from "@/types";
 import api from "@/lib/api";
 import { useEffect } from "react";
+import { applyTodoEvent, useTodoEvents } from "@/hooks/use-todo-events";
 import Navbar from "@/components/layout/Navbar";
 import TodoList from "@/components/todos/TodoList";
 import TodoForm from "@/components/todos/TodoForm";
@@ -19,7 +20,6 @@ import { Plus, Search, Filter, CheckCircle2, Circle, ListTodo } from "lucide-rea
 
 const Dashboard = () => {
   const { user } = useAuth();
-  if (!user) return null;
 
   const [todos, setTodos] = useState<Todo[]>([]);
 
@@ -28,6 +28,14 @@ const Dashboard = () => {
   const [searchQuery, setSearchQuery] = useState("");
   const [filterStatus, setFilterStatus] = useState<"all" | "completed" | "pending">("all");
   const [sortBy, setSortBy] = useState<"priority" | "title">("priority");
+  const [reloadKey, setReloadKey] = useState(0);
+
+  useTodoEvents((event) =>
+    event.type === "resync"
+      ? setReloadKey((key) => key + 1)
+      : setTodos((prev) => applyTodoEvent(prev, event)),
+    !!user?.id
+  );
 
   useEffect(() => {
     if (!user?.id) return;
@@ -42,7 +50,7 @@ const Dashboard = () => {
     };
 
     fetchTodos();
-  }, [user?.id]);
+  }, [user?.id, reloadKey]);
 
   const filteredTodos = useMemo(() => {
     let result = [...todos];
@@ -81,6 +89,8 @@ const Dashboard = () => {
     return { total, completed, pending };
   }, [todos]);
 
+  if (!user) return null;
+
   const handleToggleComplete = async (id: number) => {
     const todo = todos.find((t) => t.id === id);
     if (!todo) return;
@@ -120,15 +130,13 @@ const Dashboard = () => {
   const handleSubmit = async (data: TodoFormData) => {
     try {
       if (editingTodo) {
-        await api.put(`/todos/todo/${editingTodo.id}`, {
+        const res = await api.put(`/todos/todo/${editingTodo.id}`, {
           ...data,
           completed: editingTodo.completed,
         });
 
         setTodos((prev) =>
-          prev.map((todo) =>
-            todo.id === editingTodo.id ? { ...todo, ...data } : todo
-          )
+          prev.map((todo) => (todo.id === editingTodo.id ? res.data : todo))
         );
       } else {
         const res = await api.post("/todos/todo", {
@@ -136,9 +144,8 @@ const Dashboard = () => {
           completed: false,
         });
 
-        // backend doesn’t return todo, so refetch
-        const refreshed = await api.get("/todos");
-        setTodos(refreshed.data);
+        // backend returns the created todo, no need to refetch the list
+        setTodos((prev) => [...prev, res.data]);
       }
 
       setEditingTodo(null);